@@ -5,52 +5,186 @@ Collatz-like sequence generator (3x+3) with loop detection.
 Configuration:
     max_steps : maximum number of steps per sequence
     limit_n   : highest starting integer to run (from 1)
+    show_sequences : how many full sequences to print
+
+The loop, loop entry step and largest number of every start are written
+to a columnar file (see columnar.py) instead of being printed.
+
+Loops are shared with the other tools through the cycle catalog, so loops
+found in earlier runs are recognized as soon as a sequence reaches them.
 """
 
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from cycle_catalog import CycleCatalog
+from columnar import ColumnarWriter
+
+# Labels of the values 0..limit_n; positive labels are catalog cycle ids
+UNKNOWN = 0
+IN_PROGRESS = -1  # on the path of the current start
+DIVERGED = -2     # start ran out of steps
+
+PEAK_MAX = 2**63 - 1  # larger peaks are stored as this
+
+# Per-start report: catalog loop id, loop entry step, largest number
+COLUMNS = (("start", "q"), ("loop", "i"), ("entry", "i"), ("max", "q"))
+
+
 def collatz_next(n: int):
     return n // 2 if n % 2 == 0 else 3 * n + 3
 
+def label_basins(limit_n, max_steps, catalog):
+    """
+    Labels every start 1..limit_n with the catalog id of the loop it ends
+    in (or DIVERGED). Returns three arrays indexed by value: the label, the
+    step at which the sequence enters its loop, and the largest number on
+    the sequence up to and including the loop (-1 and the largest number
+    within max_steps for a start that diverged).
+
+    Every value up to limit_n that a sequence passes through is labelled
+    too, so a later sequence stops as soon as it reaches a labelled value
+    and each value is walked at most once over the whole range. Values
+    above limit_n are only remembered for the current start, which keeps
+    memory bounded by the arrays. A start that runs out of steps keeps
+    DIVERGED unless a later sequence reaches a loop through it.
+    """
+    labels = array("i", [UNKNOWN]) * (limit_n + 1)
+    entry = array("i", [0]) * (limit_n + 1)
+    peak = array("q", [0]) * (limit_n + 1)
+
+    known_loops = catalog.members(3, 3)  # number -> catalog cycle id
+    for n, cycle_id in known_loops.items():
+        if 0 <= n <= limit_n:
+            labels[n] = cycle_id
+            peak[n] = min(max(catalog.cycle(cycle_id)), PEAK_MAX)
+
+    for start in range(1, limit_n + 1):
+        if labels[start] > 0:
+            continue
+
+        n = start
+        path = []
+        above = {}  # number > limit_n on this path -> index in path
+        label = DIVERGED
+        loop_start_idx = None
+
+        while len(path) < max_steps:
+            if n <= limit_n:
+                if labels[n] > 0:
+                    label = labels[n]
+                    steps, top = entry[n], peak[n]
+                    break
+                if labels[n] == IN_PROGRESS:
+                    # New loop detected
+                    loop_start_idx = path.index(n)
+                    break
+                labels[n] = IN_PROGRESS
+            else:
+                if n in known_loops:
+                    label = known_loops[n]
+                    steps, top = 0, max(catalog.cycle(label))
+                    break
+                if n in above:
+                    # New loop detected above limit_n
+                    loop_start_idx = above[n]
+                    break
+                above[n] = len(path)
+
+            path.append(n)
+            n = collatz_next(n)
+
+        if loop_start_idx is not None:
+            loop = path[loop_start_idx:]
+            label, _ = catalog.add(3, 3, loop)
+            steps, top = 0, max(loop)
+            for m in loop:
+                if m <= limit_n:
+                    labels[m] = label
+                    entry[m] = 0
+                    peak[m] = min(top, PEAK_MAX)
+            del path[loop_start_idx:]
+
+        if label == DIVERGED:
+            # Only the starts are settled (every earlier start on the path
+            # ran out of steps too); the rest may still reach a loop
+            for m in path:
+                if m <= limit_n:
+                    labels[m] = DIVERGED if m <= start else UNKNOWN
+            entry[start] = -1
+            peak[start] = min(max(path), PEAK_MAX)
+            continue
+
+        # Steps and peak of each number follow from those of its successor
+        for m in reversed(path):
+            steps += 1
+            if m > top:
+                top = m
+            if m <= limit_n:
+                labels[m] = label
+                entry[m] = steps
+                peak[m] = min(top, PEAK_MAX)
+
+    return labels, entry, peak
+
+
+def full_sequence(start, steps):
+    """The sequence from start, `steps` steps long."""
+    seq = [start]
+    for _ in range(steps):
+        seq.append(collatz_next(seq[-1]))
+    return seq
+
+
 def main():
     # --- User configuration ---
     max_steps = 1000
     limit_n = 100000
+    show_sequences = 0  # print the first N sequences that diverge or end in a non-trivial loop
+    out_file = Path(__file__).resolve().parent / "a=3,k=3basins.cols"
     # ---------------------------
 
-    loop_counter = 1
-    known_loops = {}  # number -> loop number
+    with CycleCatalog() as catalog:
+        labels, entry, peak = label_basins(limit_n, max_steps, catalog)
+        loops = {label: catalog.cycle(label) for label in set(labels[1:]) if label > 0}
 
+    with ColumnarWriter(out_file, COLUMNS) as writer:
+        for lo in range(1, limit_n + 1, writer.block_rows):
+            hi = min(lo + writer.block_rows, limit_n + 1)
+            writer.extend(range(lo, hi), labels[lo:hi], entry[lo:hi], peak[lo:hi])
+
+    # Loops are numbered in order of their first start
+    counts = Counter(labels[1:])
+    loop_numbers = {
+        label: i + 1
+        for i, label in enumerate(label for label in counts if label != DIVERGED)
+    }
+
+    shown = 0
     for start in range(1, limit_n + 1):
-        n = start
-        seq = [n]
-        visited = {}
-        steps = 0
-
-        while steps < max_steps:
-            if n in known_loops:
-                loop_num = known_loops[n]
-                if loop_num != 1:
-                    print(f"LOOP {loop_num}: " + " -> ".join(map(str, seq)))
-                break
-
-            if n in visited:
-                # New loop detected
-                loop_start_idx = visited[n]
-                loop = seq[loop_start_idx:]
-                # Assign loop number to all numbers in the loop
-                for num in loop:
-                    known_loops[num] = loop_counter
-                if loop_counter != 1:
-                    print(f"LOOP {loop_counter}: " + " -> ".join(map(str, seq)))
-                loop_counter += 1
-                break
-
-            visited[n] = len(seq) - 1
-            n = collatz_next(n)
-            seq.append(n)
-            steps += 1
-        else:
+        if shown >= show_sequences:
+            break
+        label = labels[start]
+        if label == DIVERGED:
             # Max steps reached without entering a loop
-            print("DIVERGE: " + " -> ".join(map(str, seq)))
+            print("DIVERGE: " + " -> ".join(map(str, full_sequence(start, max_steps))))
+        elif loop_numbers[label] != 1:
+            seq = full_sequence(start, entry[start] + len(loops[label]))
+            print(f"LOOP {loop_numbers[label]}: " + " -> ".join(map(str, seq)))
+        else:
+            continue
+        shown += 1
+
+    print(f"Starts 1..{limit_n} (written to {out_file.name}):")
+    for label, count in counts.most_common():
+        if label == DIVERGED:
+            print(f"  DIVERGE: {count}")
+            continue
+        loop = loops[label]
+        print(f"  LOOP {loop_numbers[label]} (length {len(loop)}, min {loop[0]}): {count}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+"""
+Block-columnar binary tables for per-start results.
+
+A file is a header (magic, byte order, then the name, typecode and item
+size of every column) followed by blocks. A block is its row count as a
+uint32 and then the values of each column in turn, as raw array bytes, so
+writing a block is one write per column and reading needs no parsing.
+"""
+
+import struct
+import sys
+from array import array
+from typing import Dict, Sequence, Tuple
+
+MAGIC = b"COLS1\n"
+
+
+class ColumnarWriter:
+    """
+    Buffers rows column by column and writes them out `block_rows` at a time.
+    `columns` is a sequence of (name, array typecode).
+    """
+
+    def __init__(self, path, columns: Sequence[Tuple[str, str]], block_rows: int = 1 << 16):
+        self.columns = list(columns)
+        self.block_rows = block_rows
+        self.buffers = [array(code) for _, code in self.columns]
+        self.file = open(path, "wb")
+
+        self.file.write(MAGIC)
+        self.file.write(b"<" if sys.byteorder == "little" else b">")
+        self.file.write(struct.pack("<I", len(self.columns)))
+        for (name, code), buf in zip(self.columns, self.buffers):
+            encoded = name.encode()
+            self.file.write(struct.pack("<B", len(encoded)) + encoded)
+            self.file.write(struct.pack("<cB", code.encode(), buf.itemsize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, *row) -> None:
+        for buf, value in zip(self.buffers, row):
+            buf.append(value)
+        if len(self.buffers[0]) >= self.block_rows:
+            self.flush()
+
+    def extend(self, *columns) -> None:
+        """Append many rows at once, given as one sequence per column."""
+        for buf, values in zip(self.buffers, columns):
+            buf.extend(values)
+        if len(self.buffers[0]) >= self.block_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        rows = len(self.buffers[0])
+        if not rows:
+            return
+        self.file.write(struct.pack("<I", rows))
+        for buf in self.buffers:
+            buf.tofile(self.file)
+            del buf[:]
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+def read_columns(path) -> Dict[str, array]:
+    """Reads a whole file written by ColumnarWriter into {name: array}."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a columnar file")
+        swap = f.read(1) != (b"<" if sys.byteorder == "little" else b">")
+        (n_columns,) = struct.unpack("<I", f.read(4))
+
+        columns = []
+        for _ in range(n_columns):
+            (length,) = struct.unpack("<B", f.read(1))
+            name = f.read(length).decode()
+            code, itemsize = struct.unpack("<cB", f.read(2))
+            values = array(code.decode())
+            if values.itemsize != itemsize:
+                raise ValueError(f"column {name!r} has item size {itemsize}, "
+                                 f"expected {values.itemsize}")
+            columns.append((name, values))
+
+        while True:
+            head = f.read(4)
+            if not head:
+                break
+            (rows,) = struct.unpack("<I", head)
+            for _, values in columns:
+                values.fromfile(f, rows)
+
+    if swap:
+        for _, values in columns:
+            values.byteswap()
+    return dict(columns)
@@ -5,7 +5,17 @@ Determines whether, for given parameters `a` and `k`,
 all starting numbers up to `limit_n` diverge or any enter a loop.
 """
 
-from typing import Dict, List
+import argparse
+import multiprocessing as mp
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from cycle_catalog import CycleCatalog
+from gen import is_excluded
+from preclassify import DIVERGE, LOOP, preclassify
 
 # --- Observations ---
 # 2x0 - LOOP
@@ -55,19 +65,28 @@ a: int = 8
 k: int = 24
 max_steps: int = 500
 limit_n: int = 1000
+
+# Grid sweep (--sweep)
+sweep_a_range = range(2, 9)
+sweep_k_range = range(0, 25)
+sweep_out: Path = Path(__file__).resolve().parent / "sweep.tsv"
 # ----------------------
 
-def collatz_next(n: int) -> int:
+def collatz_next(n: int, a: int, k: int) -> int:
     """Compute next number in (a*x + k) Collatz-like sequence."""
     return n // 2 if n % 2 == 0 else a * n + k
 
 
-def all_diverge_or_loop(a: int, k: int, limit_n: int, max_steps: int) -> bool:
+def all_diverge_or_loop(a: int, k: int, limit_n: int, max_steps: int,
+                        catalog: Optional[CycleCatalog] = None) -> bool:
     """
     Returns True if all sequences diverge (no loops detected),
     otherwise False if any loop is found.
+
+    Loops already in the cycle catalog are recognized as soon as a
+    sequence steps onto them; new loops are added to it.
     """
-    known_loops: Dict[int, bool] = {}
+    known_loops: Dict[int, int] = catalog.members(a, k) if catalog is not None else {}
 
     for start in range(1, limit_n + 1):
         n: int = start
@@ -83,13 +102,13 @@ def all_diverge_or_loop(a: int, k: int, limit_n: int, max_steps: int) -> bool:
             if n in visited:
                 # loop detected
                 loop_start_idx: int = visited[n]
-                loop = seq[loop_start_idx:]
-                for num in loop:
-                    known_loops[num] = True
+                loop = seq[loop_start_idx:-1]  # seq ends with the repeated number
+                if catalog is not None:
+                    catalog.add(a, k, loop)
                 return False
 
             visited[n] = len(seq) - 1
-            n = collatz_next(n)
+            n = collatz_next(n, a, k)
             seq.append(n)
             steps += 1
 
@@ -97,11 +116,80 @@ def all_diverge_or_loop(a: int, k: int, limit_n: int, max_steps: int) -> bool:
     return True
 
 
+def sweep_cell(args: Tuple[int, int, int, int]) -> Tuple[int, int, bool, float]:
+    """Worker function: classifies one (a, k) cell. Returns (a, k, diverge, seconds)."""
+    a, k, limit_n, max_steps = args
+    started = time.perf_counter()
+    diverge = all_diverge_or_loop(a, k, limit_n, max_steps)
+    return a, k, diverge, time.perf_counter() - started
+
+
+def sweep(a_range, k_range, limit_n: int, max_steps: int, out_file: Path,
+          processes: Optional[int] = None) -> int:
+    """
+    Classifies every (a, k) pair of the grid that gen.py does not exclude.
+    Pairs settled by a rule of preclassify.py are written straight away;
+    only the undecided ones run all_diverge_or_loop, on a process pool.
+    Each cell is written to out_file as a tab-separated
+    `a, k, LOOP/DIVERGE, rule, seconds` row as soon as it is done, so an
+    interrupted sweep keeps the cells it finished.
+    Returns the number of cells written.
+    """
+    tasks = []
+    written = 0
+    with out_file.open("w", encoding="utf-8") as f:
+        f.write("a\tk\tresult\trule\tseconds\n")
+        for a in a_range:
+            for k in k_range:
+                if is_excluded(a, k):
+                    continue
+                verdict, rule = preclassify(a, k)
+                if verdict is None:
+                    tasks.append((a, k, limit_n, max_steps))
+                    continue
+                f.write(f"{a}\t{k}\t{verdict}\t{rule}\t0\n")
+                written += 1
+        f.flush()
+
+        with mp.Pool(processes=processes) as pool:
+            for a, k, diverge, seconds in pool.imap_unordered(sweep_cell, tasks):
+                verdict = DIVERGE if diverge else LOOP
+                f.write(f"{a}\t{k}\t{verdict}\tsimulated\t{seconds:.4f}\n")
+                f.flush()
+                written += 1
+
+    return written
+
+
 def main() -> None:
-    diverge: bool = all_diverge_or_loop(a, k, limit_n, max_steps)
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sweep", action="store_true",
+                        help="classify the whole (a, k) grid instead of one pair")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.sweep:
+        try:
+            written = sweep(sweep_a_range, sweep_k_range, limit_n, max_steps,
+                            sweep_out, args.processes)
+        except KeyboardInterrupt:
+            print("\nInterrupted by user. Exiting cleanly.")
+            sys.exit(0)
+        print(f"Swept {written} (a, k) pairs, table written to {sweep_out}")
+        return
+
+    verdict, rule = preclassify(a, k)
+    if verdict is not None:
+        print(f"For a={a}, k={k} (all n, by rule {rule}):")
+        print("→ ALL DIVERGE" if verdict == DIVERGE else "→ LOOPS EXIST")
+        return
+
+    with CycleCatalog() as catalog:
+        diverge: bool = all_diverge_or_loop(a, k, limit_n, max_steps, catalog)
     print(f"For a={a}, k={k}, limit_n={limit_n}:")
     print("→ ALL DIVERGE" if diverge else "→ LOOPS EXIST")
 
 
 if __name__ == "__main__":
+    mp.freeze_support()  # important for Windows
     main()
@@ -0,0 +1,59 @@
+"""
+Provable rules for the rule (a*x + k) Collatz-like maps.
+
+Many (a, k) pairs are settled by parity and growth arguments (see
+proofs.txt) and never need to be simulated. `preclassify` returns the
+verdict of such a pair together with the name of the rule that decided
+it, so every table built from it can be audited.
+"""
+
+from typing import Optional, Tuple
+
+LOOP = "LOOP"
+DIVERGE = "DIVERGE"
+
+
+def v2(n: int) -> int:
+    """Number of times 2 divides n (n != 0)."""
+    return (n & -n).bit_length() - 1
+
+
+def preclassify(a: int, k: int) -> Tuple[Optional[str], str]:
+    """
+    Returns (verdict, rule) for a*x + k with a, k >= 0, where verdict is
+    LOOP, DIVERGE, or None if no rule applies and the pair has to be
+    simulated.
+    """
+    if a == 0:
+        # every odd n goes straight to k
+        return LOOP, "a=0"
+
+    if k == 0:
+        # odd n -> a*n, which halves back to (odd part of a) * n
+        if a & (a - 1) == 0:
+            return LOOP, "k=0, a=2^x"
+        return DIVERGE, "k=0, a not 2^x"
+
+    if a % 2 == 1 and k % 2 == 0:
+        # odd n -> a*n + k is odd again and larger
+        return DIVERGE, "a odd, k even"
+
+    if a % 2 == 0 and k % 2 == 1:
+        # odd n -> a*n + k is odd again and larger
+        return DIVERGE, "a even, k odd"
+
+    if a % 2 == 1:
+        if a == 1:
+            # n -> (n + k) / 2^j with j >= 1 is below n once n > k
+            return LOOP, "a=1, k odd"
+        return None, "simulated"
+
+    # a and k both even
+    s, t = v2(a), v2(k)
+    if s != t:
+        # exactly min(s, t) halvings, leaving an odd number larger than n
+        return DIVERGE, "v2(a) != v2(k)"
+    if a >> s == 1:
+        # n -> (n + k/2^s) / 2^j with j >= 1 is below n once n is large
+        return LOOP, "a=2^s, v2(k)=s"
+    return None, "simulated"
@@ -4,9 +4,16 @@ import re
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.animation import FuncAnimation
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from matplotlib.transforms import Bbox
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
 import json
+import multiprocessing as mp
+import queue
+import threading
+import time
 from datetime import datetime
 
 
@@ -42,6 +49,12 @@ REF_POINTS = 200
 NODE_MIN, NODE_MAX = 20, 120
 GLOW_MIN, GLOW_MAX = 300, 1400
 LABEL_MIN, LABEL_MAX = 6, 12
+LABEL_COUNT = 60  # most value labels drawn at once, over all orbits
+
+POLL_INTERVAL_MS = 50  # how often the GUI collects orbits from the worker
+WORKER_BATCH = 200     # orbits per hand-over from the worker to the GUI
+POOL_MIN_ORBITS = 2000  # smaller runs are not worth the process pool
+POOL_BATCH = 500        # starts per process-pool task
 
 
 # ======================================================
@@ -61,28 +74,90 @@ def parse_map(expr):
 
 
 def collatz_orbit(start, a, b, max_steps):
-    """Compute orbit with cycle detection"""
+    """Compute orbit with cycle detection: (seq, cycle, cycled)"""
+    return collatz_orbit_stats(start, a, b, max_steps)[:3]
+
+
+def collatz_orbit_stats(start, a, b, max_steps):
+    """
+    Compute orbit with cycle detection and its deep statistical analysis.
+    The statistics are built while the orbit is iterated (exact sum,
+    Welford variance, running extremes, parity count and a one-step
+    lookback for peaks); only the median sorts the finished orbit.
+    Returns (seq, cycle, cycled, analysis), with analysis {} for an empty
+    orbit.
+    """
     seen = {}
     seq = []
     n = start
+    cycle = []
+    cycled = False
+
+    total = 0
+    w_mean = m2 = 0.0
+    max_value = min_value = start
+    even_count = 0
+    peak_indices = []
+    peak_max = 0
+    prev = prev2 = None
 
     for step in range(max_steps):
         if n in seen:
-            cycle_start = seen[n]
-            return seq, seq[cycle_start:], True
+            cycle = seq[seen[n]:]
+            cycled = True
+            break
         seen[n] = step
         seq.append(n)
-        
+
+        total += n
+        delta = n - w_mean
+        w_mean += delta / (step + 1)
+        m2 += delta * (n - w_mean)
+        if n > max_value:
+            max_value = n
+        elif n < min_value:
+            min_value = n
+        # The previous value is a peak once it is known to beat both sides
+        if prev2 is not None and prev2 < prev > n:
+            if not peak_indices or prev > peak_max:
+                peak_max = prev
+            peak_indices.append(step - 1)
+        prev2, prev = prev, n
+
         # Next iteration
         if n % 2 == 0:
+            even_count += 1
             n = n // 2
         else:
             n = a * n + b
-            
+
         if n <= 0:
             break
 
-    return seq, [], False
+    if not seq:
+        return seq, cycle, cycled, {}
+
+    length = len(seq)
+    analysis = {
+        "length": length,
+        "max_value": max_value,
+        "min_value": min_value,
+        "start_value": start,
+        "end_value": prev,
+        "mean": total / length,
+        "median": safe_median(seq),
+        "std_dev": (m2 / length) ** 0.5,
+        "growth_rate": prev / start if start != 0 else 0,
+        "cycled": cycled,
+        "cycle_length": len(cycle) if cycled else 0,
+        "even_count": even_count,
+        "odd_count": length - even_count,
+        "peak_count": len(peak_indices),
+        "peak_max": peak_max,
+        "peak_indices": peak_indices,
+        "trajectory": classify_trajectory(seq, cycled),
+    }
+    return seq, cycle, cycled, analysis
 
 
 def safe_mean(values):
@@ -113,46 +188,110 @@ def safe_std(values):
     return variance ** 0.5
 
 
-def analyze_sequence(seq, cycle, cycled):
-    """Deep statistical analysis of a sequence"""
-    if not seq:
-        return {}
-    
-    analysis = {
-        "length": len(seq),
-        "max_value": max(seq),
-        "min_value": min(seq),
-        "start_value": seq[0],
-        "end_value": seq[-1],
-        "mean": safe_mean(seq),
-        "median": safe_median(seq),
-        "std_dev": safe_std(seq),
-        "growth_rate": seq[-1] / seq[0] if seq[0] != 0 else 0,
-        "cycled": cycled,
-        "cycle_length": len(cycle) if cycled else 0,
-        "even_count": sum(1 for x in seq if x % 2 == 0),
-        "odd_count": sum(1 for x in seq if x % 2 == 1),
-    }
-    
-    # Peak analysis
-    peaks = []
-    for i in range(1, len(seq) - 1):
-        if seq[i] > seq[i-1] and seq[i] > seq[i+1]:
-            peaks.append(seq[i])
-    analysis["peak_count"] = len(peaks)
-    analysis["peak_max"] = max(peaks) if peaks else 0
-    
-    # Trajectory classification
+def classify_trajectory(seq, cycled):
+    """Trajectory classification of a non-empty sequence"""
     if cycled:
-        analysis["trajectory"] = "Cyclic"
+        return "Cyclic"
     elif len(seq) >= 300:  # Max steps reached
-        analysis["trajectory"] = "Divergent/Runaway"
+        return "Divergent/Runaway"
     elif seq[-1] <= 0:
-        analysis["trajectory"] = "Collapsed"
+        return "Collapsed"
     else:
-        analysis["trajectory"] = "Terminated"
-    
-    return analysis
+        return "Terminated"
+
+
+def orbit_batch(map_tuple, starts, max_steps):
+    """Process-pool task: (seq, cycle, cycled, analysis) of every start, in order"""
+    results = []
+    for s in starts:
+        results.append(collatz_orbit_stats(s, *map_tuple, max_steps))
+    return results
+
+
+def compute_orbits(jobs, max_steps, cancel_event, out_queue, pool=None):
+    """
+    Background worker: computes and analyses the orbits of `jobs`, a list of
+    (map_tuple, color, starts), off the Tk thread. Finished orbits are put on
+    out_queue in batches as ("orbits", [(map_tuple, start, seq, cycle, cycled,
+    color, analysis), ...]). Stops early once cancel_event is set and always
+    ends with ("done", None).
+
+    With a process pool the (map, starts) pairs are fanned out in batches of
+    POOL_BATCH starts; either way orbits arrive in submission order.
+    """
+    batch = []
+    last_put = time.monotonic()
+    try:
+        if pool is not None:
+            compute_orbits_pooled(jobs, max_steps, cancel_event, out_queue, pool)
+            return
+
+        for map_tuple, color, starts in jobs:
+            for s in starts:
+                if cancel_event.is_set():
+                    return
+                seq, cycle, cycled, analysis = collatz_orbit_stats(
+                    s, *map_tuple, max_steps)
+                batch.append((map_tuple, s, seq, cycle, cycled, color, analysis))
+
+                if (len(batch) >= WORKER_BATCH or
+                        time.monotonic() - last_put > POLL_INTERVAL_MS / 1000):
+                    out_queue.put(("orbits", batch))
+                    batch = []
+                    last_put = time.monotonic()
+    except Exception as e:
+        out_queue.put(("error", str(e)))
+    finally:
+        if batch:
+            out_queue.put(("orbits", batch))
+        out_queue.put(("done", None))
+
+
+def compute_orbits_pooled(jobs, max_steps, cancel_event, out_queue, pool):
+    """Process-pool part of compute_orbits"""
+    tasks = []
+    for map_tuple, color, starts in jobs:
+        for i in range(0, len(starts), POOL_BATCH):
+            chunk = starts[i:i + POOL_BATCH]
+            future = pool.submit(orbit_batch, map_tuple, chunk, max_steps)
+            tasks.append((map_tuple, color, chunk, future))
+
+    try:
+        # Collected in submission order, so the GUI gets the same orbit order
+        # (and colours) as from a serial run
+        for map_tuple, color, chunk, future in tasks:
+            while True:
+                if cancel_event.is_set():
+                    return
+                try:
+                    results = future.result(timeout=POLL_INTERVAL_MS / 1000)
+                    break
+                except FutureTimeout:
+                    pass
+
+            out_queue.put(("orbits", [
+                (map_tuple, s, seq, cycle, cycled, color, analysis)
+                for s, (seq, cycle, cycled, analysis) in zip(chunk, results)
+            ]))
+    finally:
+        for _, _, _, future in tasks:
+            future.cancel()
+
+
+def label_points(seq):
+    """(step, value) of the points of seq worth a value label"""
+    step = max(1, len(seq) // 20)  # Limit label density
+    return [(i, y) for i, y in enumerate(seq) if i % step == 0 and y < 99999]
+
+
+def to_plot_array(values):
+    """values as a float array; ints too large for a float become +-inf"""
+    try:
+        return np.array(values, dtype=float)
+    except OverflowError:
+        return np.array([float(x) if abs(x) < 1e308 else
+                         float("inf") if x > 0 else float("-inf")
+                         for x in values])
 
 
 # ======================================================
@@ -283,7 +422,8 @@ class CollatzVisualizer(tk.Tk):
         self.theme = THEMES[self.current_theme]
         self.configure(bg=self.theme["bg"])
 
-        self.animation = None
+        self.animation = None      # timer of the running animation
+        self.animation_cid = None  # its redraw hook
         self.show_labels = tk.BooleanVar(value=False)
         self.show_grid = tk.BooleanVar(value=True)
         self.show_peaks = tk.BooleanVar(value=False)
@@ -292,6 +432,15 @@ class CollatzVisualizer(tk.Tk):
         self.analyses = defaultdict(list)
         self.advanced_config = None
 
+        # Background computation
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.result_queue = queue.Queue()
+        self.total_orbits = 0
+        self.computed_orbits = 0
+        self.compute_started = 0.0
+        self.pool = None  # process pool for large runs, started on first use
+
         self._configure_styles()
         self._build_ui()
     
@@ -355,11 +504,18 @@ class CollatzVisualizer(tk.Tk):
         toolbar.update()
 
         # Status bar
+        status_frame = tk.Frame(self, bg=self.theme["panel"])
+        status_frame.pack(fill="x", side="bottom")
+
         self.status_var = tk.StringVar(value="Ready")
-        status_bar = tk.Label(self, textvariable=self.status_var,
+        status_bar = tk.Label(status_frame, textvariable=self.status_var,
                             bg=self.theme["panel"], fg=self.theme["text"],
                             anchor="w", padx=10)
-        status_bar.pack(fill="x", side="bottom")
+        status_bar.pack(side="left", fill="x", expand=True)
+
+        self.progress = ttk.Progressbar(status_frame, length=200,
+                                        mode="determinate")
+        self.progress.pack(side="right", padx=10, pady=2)
 
     def _create_input_section(self, parent):
         input_frame = tk.LabelFrame(parent, text="Configuration", 
@@ -462,8 +618,17 @@ class CollatzVisualizer(tk.Tk):
         btn_style = {"bg": self.theme["accent"], "fg": "white", 
                     "font": ("Arial", 10, "bold"), "width": 15}
 
-        tk.Button(button_frame, text="🚀 Visualize", command=self.visualize,
-                 **btn_style).pack(pady=3)
+        self.visualize_button = tk.Button(button_frame, text="🚀 Visualize",
+                                          command=self.visualize, **btn_style)
+        self.visualize_button.pack(pady=3)
+
+        self.cancel_button = tk.Button(button_frame, text="⏹ Cancel",
+                                       command=self.cancel_computation,
+                                       bg=self.theme["panel"],
+                                       fg=self.theme["text"],
+                                       font=("Arial", 10, "bold"), width=15,
+                                       state="disabled")
+        self.cancel_button.pack(pady=3)
         
         tk.Button(button_frame, text="📊 Deep Analysis", 
                  command=self.show_analysis, bg=self.theme["highlight"],
@@ -507,73 +672,143 @@ class CollatzVisualizer(tk.Tk):
             return [int(x) for x in self.starts_entry.get().split()]
 
     def visualize(self):
-        """Main visualization routine"""
-        try:
-            if self.animation is not None:
-                if self.animation.event_source is not None:
-                    self.animation.event_source.stop()
-                self.animation = None
+        """Main visualization routine: starts the background computation"""
+        if self.worker is not None:
+            return
 
-            self.status_var.set("Computing orbits...")
-            self.update()
+        try:
+            self.stop_animation()
 
             max_steps = int(self.steps_entry.get())
-            self.results.clear()
-            self.analyses.clear()
             cmap = plt.get_cmap("tab20")
 
-            total_computed = 0
-            
             # Use advanced config if available
             if self.advanced_config:
-                for i, (map_tuple, starts) in enumerate(self.advanced_config):
-                    color = cmap(i % 20)
-                    for s in starts:
-                        seq, cycle, cycled = collatz_orbit(s, *map_tuple, max_steps)
-                        self.results[map_tuple].append((s, seq, cycle, cycled, color))
-                        
-                        # Perform analysis
-                        analysis = analyze_sequence(seq, cycle, cycled)
-                        self.analyses[map_tuple].append((s, analysis))
-                        
-                        total_computed += 1
-                        if total_computed % 10 == 0:
-                            self.status_var.set(f"Computed {total_computed} orbits...")
-                            self.update()
+                jobs = [(map_tuple, cmap(i % 20), starts)
+                        for i, (map_tuple, starts) in enumerate(self.advanced_config)]
             else:
                 # Use standard config
                 maps = [parse_map(m) for m in self.maps_entry.get().split()]
                 starts = self.get_start_values()
-                
-                for i, m in enumerate(maps):
-                    color = cmap(i % 20)
-                    for j, s in enumerate(starts):
-                        seq, cycle, cycled = collatz_orbit(s, *m, max_steps)
-                        self.results[m].append((s, seq, cycle, cycled, color))
-                        
-                        # Perform analysis
-                        analysis = analyze_sequence(seq, cycle, cycled)
-                        self.analyses[m].append((s, analysis))
-                        
-                        total_computed += 1
-                        if total_computed % 10 == 0:
-                            self.status_var.set(f"Computed {total_computed} orbits...")
-                            self.update()
-
-            self.status_var.set(f"Rendering {total_computed} orbits...")
-            self.update()
+                jobs = [(m, cmap(i % 20), starts) for i, m in enumerate(maps)]
+
+        except Exception as e:
+            messagebox.showerror("Error", f"Visualization failed: {str(e)}")
+            self.status_var.set("Error occurred")
+            return
+
+        self.results.clear()
+        self.analyses.clear()
+        self.total_orbits = sum(len(starts) for _, _, starts in jobs)
+        self.computed_orbits = 0
+        self.compute_started = time.monotonic()
+        self.progress.config(maximum=max(1, self.total_orbits), value=0)
+        self.status_var.set("Computing orbits...")
+
+        # Colours are fixed per job above, before anything is computed
+        pool = self.get_pool() if self.total_orbits >= POOL_MIN_ORBITS else None
+
+        # The worker never touches Tk; orbits come back through the queue
+        self.cancel_event = threading.Event()
+        self.result_queue = queue.Queue()
+        self.worker = threading.Thread(
+            target=compute_orbits,
+            args=(jobs, max_steps, self.cancel_event, self.result_queue, pool),
+            daemon=True
+        )
+        self.worker.start()
+
+        self.visualize_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.after(POLL_INTERVAL_MS, self._poll_worker)
+
+    def get_pool(self):
+        """The process pool for large runs, started on first use"""
+        if self.pool is None:
+            # spawn, not fork: the GUI process has Tk and worker threads
+            self.pool = ProcessPoolExecutor(mp_context=mp.get_context("spawn"))
+        return self.pool
+
+    def cancel_computation(self):
+        """Stop the background computation; orbits finished so far are kept"""
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.status_var.set("Cancelling...")
+
+    def _poll_worker(self):
+        """Collect orbits from the worker, and render once it has finished"""
+        finished = False
+        error = None
+        try:
+            while True:
+                kind, payload = self.result_queue.get_nowait()
+                if kind == "orbits":
+                    for map_tuple, s, seq, cycle, cycled, color, analysis in payload:
+                        self.results[map_tuple].append((s, seq, cycle, cycled, color))
+                        self.analyses[map_tuple].append((s, analysis))
+                    self.computed_orbits += len(payload)
+                elif kind == "error":
+                    error = payload
+                else:
+                    finished = True
+        except queue.Empty:
+            pass
+
+        if not finished:
+            self._show_progress()
+            self.after(POLL_INTERVAL_MS, self._poll_worker)
+            return
+
+        self.worker = None
+        self.visualize_button.config(state="normal")
+        self.cancel_button.config(state="disabled")
+        self.progress.config(value=self.computed_orbits)
+
+        if error is not None:
+            messagebox.showerror("Error", f"Visualization failed: {error}")
+            self.status_var.set("Error occurred")
+            return
+
+        cancelled = self.cancel_event.is_set()
+        if cancelled and not self.computed_orbits:
+            self.status_var.set("Cancelled")
+            return
+
+        try:
+            self.status_var.set(f"Rendering {self.computed_orbits} orbits...")
+            self.update_idletasks()
 
             if self.animate_var:
                 self.animate()
             else:
                 self.draw_static()
 
-            self.status_var.set(f"✓ Visualized {total_computed} orbits")
+            if cancelled:
+                self.status_var.set(f"✓ Visualized {self.computed_orbits} of "
+                                    f"{self.total_orbits} orbits (cancelled)")
+            else:
+                self.status_var.set(f"✓ Visualized {self.computed_orbits} orbits")
 
         except Exception as e:
             messagebox.showerror("Error", f"Visualization failed: {str(e)}")
             self.status_var.set("Error occurred")
 
+    def _show_progress(self):
+        """Progress bar and status line, with an estimate of the time left"""
+        done, total = self.computed_orbits, self.total_orbits
+        self.progress.config(value=done)
+        if self.cancel_event.is_set():
+            return
+
+        status = f"Computed {done:,}/{total:,} orbits"
+        if done:
+            remaining = (time.monotonic() - self.compute_started) / done * (total - done)
+            if remaining >= 60:
+                status += f" - about {remaining / 60:.1f} min left"
+            else:
+                status += f" - about {remaining:.0f} s left"
+        self.status_var.set(status)
+
     def compute_visual_scale(self):
         """Adaptive scaling based on data density"""
         total_points = sum(
@@ -587,6 +822,7 @@ class CollatzVisualizer(tk.Tk):
 
     def draw_static(self):
         """Render static visualization"""
+        self.stop_animation()
         self.ax.clear()
         
         if self.log_scale.get():
@@ -600,46 +836,76 @@ class CollatzVisualizer(tk.Tk):
         glow_size = max(GLOW_MIN, min(GLOW_MAX, 900 * scale))
         label_size = max(LABEL_MIN, min(LABEL_MAX, 9 * scale))
 
+        show_peaks = self.show_peaks.get()
+        show_labels = self.show_labels.get()
+
+        # Coordinates of every orbit are gathered first and drawn as a few
+        # collections, so the artist count does not grow with the orbits
+        lines, line_colors = [], []
+        cycle_lines, cycle_colors = [], []
+        peak_points = []
+        label_candidates = []
+        legend_handles = []
+
         for map_key, seqs in self.results.items():
-            for start, seq, cycle, cycled, color in seqs:
-                xs = list(range(len(seq)))
-                
-                # Convert to float for plotting if values are reasonable
-                plot_seq = seq
-                if max(seq) < 1e15:  # Safe for float conversion
-                    plot_seq = [float(x) for x in seq]
-                
-                # Main trajectory
-                self.ax.plot(xs, plot_seq, color=color, alpha=0.7, linewidth=1.5,
-                           label=f"{map_key[0]}x{map_key[1]:+d} @ {start}" 
-                           if len(seqs) == 1 else None)
-                
-                self.ax.scatter(xs, plot_seq, s=node_size, color=color, 
-                              alpha=0.8, edgecolors='white', linewidth=0.5)
+            analyses = self.analyses[map_key]
+            for (start, seq, cycle, cycled, color), (_, analysis) in zip(seqs, analyses):
+                if not seq:
+                    continue
+                xs = np.arange(len(seq), dtype=float)
+                line = np.column_stack((xs, to_plot_array(seq)))
+                lines.append(line)
+                line_colors.append(color)
+
+                if len(seqs) == 1:
+                    legend_handles.append(Line2D(
+                        [], [], color=color, alpha=0.7, linewidth=1.5,
+                        label=f"{map_key[0]}x{map_key[1]:+d} @ {start}"))
 
                 # Cycle highlighting
                 if cycled:
-                    cycle_x = list(range(len(seq) - len(cycle), len(seq)))
-                    plot_cycle = cycle if max(cycle) < 1e15 else [float(x) for x in cycle]
-                    self.ax.scatter(cycle_x, plot_cycle, s=glow_size,
-                                  color=color, alpha=0.15, marker='o')
-                    # Add cycle border
-                    self.ax.plot(cycle_x, plot_cycle, color=color, linewidth=3,
-                               alpha=0.4, linestyle='--')
+                    cycle_lines.append(line[len(seq) - len(cycle):])
+                    cycle_colors.append(color)
 
                 # Peak markers
-                if self.show_peaks.get():
-                    for i in range(1, len(seq) - 1):
-                        if seq[i] > seq[i-1] and seq[i] > seq[i+1]:
-                            plot_val = float(seq[i]) if seq[i] < 1e15 else seq[i]
-                            self.ax.scatter([i], [plot_val], s=node_size*2,
-                                          marker='^', color='yellow',
-                                          edgecolors='red', linewidth=2,
-                                          zorder=10)
+                if show_peaks:
+                    peaks = analysis["peak_indices"]
+                    peak_points.append(line[peaks])
 
                 # Labels
-                if self.show_labels.get():
-                    self.draw_labels(xs, plot_seq, label_size)
+                if show_labels:
+                    label_candidates += label_points(seq)
+
+        if lines:
+            # Main trajectories and their nodes
+            self.ax.add_collection(LineCollection(
+                lines, colors=line_colors, alpha=0.7, linewidths=1.5))
+            points = np.concatenate(lines)
+            self.ax.scatter(points[:, 0], points[:, 1], s=node_size,
+                          c=np.repeat(line_colors, [len(l) for l in lines], axis=0),
+                          alpha=0.8, edgecolors='white', linewidth=0.5)
+
+        if cycle_lines:
+            points = np.concatenate(cycle_lines)
+            self.ax.scatter(points[:, 0], points[:, 1], s=glow_size,
+                          c=np.repeat(cycle_colors, [len(l) for l in cycle_lines], axis=0),
+                          alpha=0.15, marker='o')
+            # Add cycle border
+            self.ax.add_collection(LineCollection(
+                cycle_lines, colors=cycle_colors, linewidths=3, alpha=0.4,
+                linestyles='--'))
+
+        if peak_points:
+            points = np.concatenate(peak_points)
+            self.ax.scatter(points[:, 0], points[:, 1], s=node_size*2,
+                          marker='^', color='yellow', edgecolors='red',
+                          linewidth=2, zorder=10)
+
+        if label_candidates:
+            self.draw_labels(label_candidates, label_size)
+
+        # Collections do not rescale the axes by themselves
+        self.ax.autoscale_view()
 
         self.ax.set_xlabel("Step", color=self.theme["text"], fontsize=12)
         self.ax.set_ylabel("Value", color=self.theme["text"], fontsize=12)
@@ -648,77 +914,204 @@ class CollatzVisualizer(tk.Tk):
                          fontweight='bold', pad=20)
         self.ax.tick_params(colors=self.theme["text"])
         
-        if len(self.results) <= 5:
-            self.ax.legend(facecolor=self.theme["panel"], 
+        if len(self.results) <= 5 and legend_handles:
+            self.ax.legend(handles=legend_handles,
+                          facecolor=self.theme["panel"], 
                           edgecolor=self.theme["text"],
                           labelcolor=self.theme["text"])
 
         self.canvas.draw_idle()
 
-    def draw_labels(self, xs, ys, fontsize):
-        """Draw value labels on points"""
-        step = max(1, len(xs) // 20)  # Limit label density
-        for i, (x, y) in enumerate(zip(xs, ys)):
-            if i % step == 0 and y < 99999:
-                self.ax.text(x, y, str(int(y)) if isinstance(y, float) else str(y), 
-                           fontsize=fontsize,
-                           color=self.theme["text"], ha="center",
-                           va="bottom", alpha=0.7)
+    def draw_labels(self, points, fontsize):
+        """Draw value labels on the LABEL_COUNT highest (step, value) points
+        of all orbits; returns the text artists"""
+        texts = []
+        for x, y in sorted(set(points), key=lambda p: (-p[1], p[0]))[:LABEL_COUNT]:
+            text = self.ax.text(x, y, str(int(y)) if isinstance(y, float) else str(y),
+                                fontsize=fontsize,
+                                color=self.theme["text"], ha="center",
+                                va="bottom", alpha=0.7)
+            texts.append(text)
+        return texts
 
     def animate(self):
-        """Animated visualization"""
+        """Animated visualization
+
+        All artists are created once, from coordinates computed up front.
+        Each frame paints only what is new (one segment and one node per
+        orbit still growing, plus glows due at that step) on top of the
+        previous frame and blits the axes, so late frames cost no more than
+        early ones. Value labels are added on the final frame only. The step
+        count goes in the title, whose strip above the axes is blitted on
+        its own. A full redraw (resize, pan, zoom) skips the animated
+        artists; the prefix artists then repaint everything up to the
+        current frame.
+        """
+        self.stop_animation()
         self.ax.clear()
-        
-        max_len = max(
-            len(seq) for seqs in self.results.values()
-            for _, seq, _, _, _ in seqs
-        )
-
-        def update(frame):
-            self.ax.clear()
-            if self.log_scale.get():
-                self.ax.set_yscale("log")
-            if self.show_grid.get():
-                self.ax.grid(True, alpha=0.2, color=self.theme["text"])
-
-            scale = self.compute_visual_scale()
-            node_size = max(NODE_MIN, min(NODE_MAX, 60 * scale))
-            glow_size = max(GLOW_MIN, min(GLOW_MAX, 900 * scale))
-            label_size = max(LABEL_MIN, min(LABEL_MAX, 9 * scale))
-
-            for seqs in self.results.values():
-                for _, seq, cycle, cycled, color in seqs:
-                    f = min(frame, len(seq))
-                    xs = list(range(f))
-                    ys = seq[:f]
-                    
-                    # Convert for plotting
-                    plot_ys = ys if max(ys) < 1e15 else [float(x) for x in ys]
-
-                    self.ax.plot(xs, plot_ys, color=color, alpha=0.7, linewidth=1.5)
-                    self.ax.scatter(xs, plot_ys, s=node_size, color=color, alpha=0.8)
+        if self.log_scale.get():
+            self.ax.set_yscale("log")
+        if self.show_grid.get():
+            self.ax.grid(True, alpha=0.2, color=self.theme["text"])
+        self.ax.tick_params(colors=self.theme["text"])
 
-                    if cycled and f >= len(seq):
-                        cycle_x = list(range(len(seq) - len(cycle), len(seq)))
-                        plot_cycle = cycle if max(cycle) < 1e15 else [float(x) for x in cycle]
-                        self.ax.scatter(cycle_x, plot_cycle, s=glow_size,
-                                      color=color, alpha=0.15)
+        scale = self.compute_visual_scale()
+        node_size = max(NODE_MIN, min(NODE_MAX, 60 * scale))
+        glow_size = max(GLOW_MIN, min(GLOW_MAX, 900 * scale))
+        label_size = max(LABEL_MIN, min(LABEL_MAX, 9 * scale))
 
-                    if self.show_labels.get():
-                        self.draw_labels(xs, plot_ys, label_size)
+        lines, line_colors = [], []
+        cycle_lines, glow_colors, glow_frames = [], [], []
+        label_candidates = []
+        for seqs in self.results.values():
+            for _, seq, cycle, cycled, color in seqs:
+                if not seq:  # Skip empty sequences
+                    continue
+                line = np.column_stack((np.arange(len(seq), dtype=float),
+                                        to_plot_array(seq)))
+                lines.append(line)
+                line_colors.append(color)
+
+                # The cycle glows once the whole orbit is shown
+                if cycled and cycle:
+                    cycle_lines.append(line[len(seq) - len(cycle):])
+                    glow_colors += [color] * len(cycle)
+                    glow_frames += [len(seq)] * len(cycle)
 
-            self.ax.set_title(f"Collatz Trajectories - Step {frame}/{max_len}",
-                            color=self.theme["text"], fontsize=16)
-            self.ax.tick_params(colors=self.theme["text"])
+                if self.show_labels.get():
+                    label_candidates += label_points(seq)
 
-        self.animation = FuncAnimation(self.fig, update,
-                                      frames=max_len + 5,
-                                      interval=30, repeat=False)
-        self.canvas.draw_idle()
+        if not lines:
+            return
+        max_len = max(len(line) for line in lines)
+        labels = self.draw_labels(label_candidates, label_size)
+
+        # Orbits longest first, so the orbits still growing are a prefix
+        order = sorted(range(len(lines)), key=lambda i: -len(lines[i]))
+        lines = [lines[i] for i in order]
+        line_colors = np.array([line_colors[i] for i in order])
+        neg_lengths = -np.array([len(line) for line in lines])
+
+        # Nodes, glows and labels sorted by the frame they appear in, so
+        # what is shown at any frame is a prefix and what is new a slice
+        points = np.concatenate(lines)
+        point_colors = np.repeat(line_colors, [len(l) for l in lines], axis=0)
+        order = np.argsort(points[:, 0], kind="stable")
+        points, point_colors = points[order], point_colors[order]
+        node_frames = points[:, 0] + 1
+
+        if cycle_lines:
+            glow_points = np.concatenate(cycle_lines)
+            glow_frames = np.array(glow_frames)
+            order = np.argsort(glow_frames, kind="stable")
+            glow_points, glow_frames = glow_points[order], glow_frames[order]
+            glow_colors = np.array(glow_colors)[order]
+        else:
+            glow_points, glow_frames = np.empty((0, 2)), np.empty(0)
+            glow_colors = np.empty((0, 4))
+
+        def new_at(frames, frame):
+            return slice(np.searchsorted(frames, frame, side="left"),
+                         np.searchsorted(frames, frame, side="right"))
+
+        # Prefix artists; scatters with every point also fix the axis limits
+        nodes = self.ax.scatter(points[:, 0], points[:, 1], s=node_size,
+                              c=point_colors, alpha=0.8)
+        glow = self.ax.scatter(glow_points[:, 0], glow_points[:, 1],
+                             s=glow_size, c=glow_colors, alpha=0.15)
+        self.ax.set_autoscale_on(False)
+        trajectories = LineCollection([], colors=line_colors, alpha=0.7,
+                                      linewidths=1.5)
+        self.ax.add_collection(trajectories, autolim=False)
+
+        # Artists for what is new in a frame
+        new_segments = LineCollection([], alpha=0.7, linewidths=1.5)
+        self.ax.add_collection(new_segments, autolim=False)
+        new_nodes = self.ax.scatter([], [], s=node_size, alpha=0.8)
+        new_glow = self.ax.scatter([], [], s=glow_size, alpha=0.15)
+
+        title = self.ax.set_title("", color=self.theme["text"], fontsize=16)
+
+        for artist in [nodes, glow, trajectories, new_segments, new_nodes,
+                       new_glow, title] + labels:
+            artist.set_animated(True)
+
+        frame = 0
+        title_box = title_background = None
+
+        def show_progress():
+            self.canvas.restore_region(title_background)
+            title.set_text(f"Collatz Trajectories - Step {frame}/{max_len}")
+            self.ax.draw_artist(title)
+
+        def on_draw(event):
+            nonlocal title_box, title_background
+            # The strip above the axes, as drawn without the title
+            figure_box = self.ax.figure.bbox
+            title_box = Bbox.from_extents(figure_box.x0, self.ax.bbox.y1,
+                                          figure_box.x1, figure_box.y1)
+            title_background = self.canvas.copy_from_bbox(title_box)
+
+            # Repaint everything up to the current frame
+            trajectories.set_segments([line[:frame] for line in lines])
+            nodes.set_offsets(points[:np.searchsorted(node_frames, frame, side="right")])
+            glow.set_offsets(glow_points[:np.searchsorted(glow_frames, frame, side="right")])
+            for artist in (glow, trajectories, nodes):
+                self.ax.draw_artist(artist)
+            show_progress()
+            if frame >= max_len:
+                for text in labels:
+                    self.ax.draw_artist(text)
+
+        def step():
+            nonlocal frame
+            if frame >= max_len:
+                self.animation.stop()
+                return
+            frame += 1
+
+            growing = np.searchsorted(neg_lengths, -frame, side="right")
+            if frame >= 2 and growing:
+                new_segments.set_segments(
+                    [line[frame - 2:frame] for line in lines[:growing]])
+                new_segments.set_color(line_colors[:growing])
+                self.ax.draw_artist(new_segments)
+
+            new = new_at(glow_frames, frame)
+            if new.start < new.stop:
+                new_glow.set_offsets(glow_points[new])
+                new_glow.set_facecolor(glow_colors[new])
+                self.ax.draw_artist(new_glow)
+
+            new = new_at(node_frames, frame)
+            if new.start < new.stop:
+                new_nodes.set_offsets(points[new])
+                new_nodes.set_facecolor(point_colors[new])
+                self.ax.draw_artist(new_nodes)
+
+            show_progress()
+            if frame == max_len:
+                for text in labels:
+                    self.ax.draw_artist(text)
+            self.canvas.blit(self.ax.bbox)
+            self.canvas.blit(title_box)
+
+        self.animation_cid = self.canvas.mpl_connect("draw_event", on_draw)
+        self.canvas.draw()
+        self.animation = self.canvas.new_timer(interval=30)
+        self.animation.add_callback(step)
+        self.animation.start()
+
+    def stop_animation(self):
+        """Stop a running animation and unhook its redraws"""
+        if self.animation is not None:
+            self.animation.stop()
+            self.canvas.mpl_disconnect(self.animation_cid)
+            self.animation = None
 
     def redraw(self):
         """Redraw without recomputing"""
-        if not self.animate_var and self.results:
+        if self.worker is None and not self.animate_var and self.results:
             self.draw_static()
 
     # --------------------------------------------------
@@ -961,6 +1354,8 @@ class CollatzVisualizer(tk.Tk):
                     # Convert all values to JSON-serializable types
                     analysis_copy = {}
                     for key, value in analysis.items():
+                        if key == "peak_indices":  # derived from the orbit
+                            continue
                         if isinstance(value, (int, float, str, bool, type(None))):
                             analysis_copy[key] = value
                         else:
@@ -983,5 +1378,8 @@ class CollatzVisualizer(tk.Tk):
 # ======================================================
 
 if __name__ == "__main__":
+    mp.freeze_support()  # important for Windows
     app = CollatzVisualizer()
     app.mainloop()
+    if app.pool is not None:
+        app.pool.shutdown(cancel_futures=True)
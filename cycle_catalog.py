@@ -0,0 +1,158 @@
+"""
+Persistent catalog of cycles of the maps n -> n/2 (n even), a*n + b (n odd).
+
+Every cycle is stored once, keyed by (a, b, canonical rotation), together
+with its length, number of odd steps and smallest element. The catalog is
+shared by generalized_map_enumerator.py and the Collatz-like/an+k
+simulators, so a cycle found by one of them is recognized by all the
+others as soon as an orbit steps onto any of its elements.
+"""
+
+import hashlib
+import sqlite3
+from pathlib import Path
+
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "cycles.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog (
+    id INTEGER PRIMARY KEY,
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    odd_steps INTEGER NOT NULL,
+    min_element INTEGER NOT NULL,
+    elements TEXT NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS catalog_by_cycle ON catalog (a, b, digest);
+CREATE INDEX IF NOT EXISTS catalog_by_length ON catalog (length);
+"""
+
+INT64_MAX = 2**63 - 1
+
+
+def canonical_cycle(cycle):
+    """Rotate a cycle so that it starts at its smallest element."""
+    cycle = list(cycle)
+    m = min(cycle)
+    i = cycle.index(m)
+    return tuple(cycle[i:] + cycle[:i])
+
+
+def _digest(cycle):
+    return hashlib.sha1(",".join(map(str, cycle)).encode()).hexdigest()
+
+
+class CycleCatalog:
+    """
+    SQLite-backed cycle catalog with an in-memory hash index.
+
+    The cycles of a map are loaded the first time the map is used; after
+    that `add` and `lookup` are dictionary operations. New cycles are
+    written in one transaction by `flush`, which also runs on close.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._ids = {}        # (a, b, canonical) -> id
+        self._members = {}    # (a, b) -> {element: id}
+        self._cycles = {}     # id -> canonical
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _load(self, a, b):
+        members = self._members.get((a, b))
+        if members is not None:
+            return members
+
+        members = self._members[(a, b)] = {}
+        rows = self.conn.execute(
+            "SELECT id, elements FROM catalog WHERE a = ? AND b = ?", (a, b)
+        )
+        for cycle_id, elements in rows:
+            cycle = tuple(int(x) for x in elements.split(","))
+            self._ids[(a, b, cycle)] = cycle_id
+            self._cycles[cycle_id] = cycle
+            for n in cycle:
+                members[n] = cycle_id
+        return members
+
+    def add(self, a, b, cycle):
+        """
+        Register a cycle of the map (in any rotation).
+        Returns (cycle_id, is_new).
+        """
+        members = self._load(a, b)
+        cycle = canonical_cycle(cycle)
+        cycle_id = self._ids.get((a, b, cycle))
+        if cycle_id is not None:
+            return cycle_id, False
+
+        min_element = cycle[0]
+        cur = self.conn.execute(
+            "INSERT INTO catalog VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                a, b, _digest(cycle), len(cycle),
+                sum(1 for n in cycle if n % 2 == 1),
+                min_element if -INT64_MAX <= min_element <= INT64_MAX else str(min_element),
+                ",".join(map(str, cycle)),
+            ),
+        )
+        cycle_id = cur.lastrowid
+        self._pending.append(cycle_id)
+
+        self._ids[(a, b, cycle)] = cycle_id
+        self._cycles[cycle_id] = cycle
+        for n in cycle:
+            members[n] = cycle_id
+        return cycle_id, True
+
+    def flush(self):
+        if self._pending:
+            self.conn.commit()
+            self._pending = []
+
+    def lookup(self, a, b, n):
+        """Id of the cycle of the map that n lies on, or None."""
+        return self._load(a, b).get(n)
+
+    def members(self, a, b):
+        """
+        Live {element: cycle_id} index of the map; it grows as cycles are
+        added, so callers can keep a reference to it.
+        """
+        return self._load(a, b)
+
+    def cycle(self, cycle_id):
+        return self._cycles[cycle_id]
+
+    def cycles(self, a, b):
+        """Canonical cycles of the map, in the order they were catalogued."""
+        return [self._cycles[i] for i in sorted(set(self._load(a, b).values()))]
+
+    def stats(self, cycle_id):
+        """(a, b, length, odd_steps, min_element) of a catalogued cycle."""
+        self.flush()
+        return self.conn.execute(
+            "SELECT a, b, length, odd_steps, min_element FROM catalog WHERE id = ?",
+            (cycle_id,),
+        ).fetchone()
+
+    def query(self, sql, params=()):
+        """Run an arbitrary read query against the catalog."""
+        self.flush()
+        return self.conn.execute(sql, params).fetchall()
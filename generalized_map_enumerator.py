@@ -1,13 +1,91 @@
 import sys
+import queue
+import threading
+import time
 import multiprocessing as mp
+from functools import partial
+from math import log2
 
+from cycle_catalog import CycleCatalog, canonical_cycle
+from results_store import ResultsStore
+from sweep_scheduler import CostModel, plan_b
 
-def collatz_like_map(a, b, n, max_steps=5000):
+try:
+    import lane_engine  # needs NumPy
+except ImportError:
+    lane_engine = None
+
+
+DIVERGED = "diverged"
+
+# The divergence check runs only on steps that are a multiple of this
+# (a power of two), so it costs one AND per step.
+DIVERGENCE_CHECK_INTERVAL = 64
+
+# Below this many seeds the per-step overhead of the NumPy lane engine
+# outweighs what it saves over the scalar loop.
+LANE_MIN_SEEDS = 2048
+
+
+def expected_drift(a):
+    """
+    Expected change of log2(n) per step for odd a, b.
+
+    After a*n + b the value is even, and the number of halvings that follow
+    is on average 2, so a block of ~3 steps changes log2(n) by about
+    log2(a) - 2.
+    """
+    return (log2(a) - 2) / 3
+
+
+def expected_steps(a, max_steps, divergence_bits=128):
+    """
+    Rough number of steps per seed of a map, used to schedule sweeps
+    before any task has been timed: maps with a positive drift run until
+    the divergence check stops them, 3x+b orbits usually reach a cycle
+    within a few hundred steps.
+    """
+    drift = expected_drift(a) if a > 0 else 0
+    if drift <= 0:
+        return min(max_steps, 200)
+    return min(max_steps, divergence_bits / drift)
+
+
+def known_cycle_index(cycles):
+    """{element: (cycle, position)} for the `known` argument of collatz_like_map."""
+    return {n: (cycle, i) for cycle in cycles for i, n in enumerate(cycle)}
+
+
+def collatz_like_map(a, b, n, max_steps=5000, divergence_bits=128, known=None):
+    """
+    Returns (orbit, cycle_start) if n reaches a cycle within max_steps,
+    DIVERGED if the orbit is a runaway, and None if undecided.
+
+    An orbit counts as a runaway once it is at least divergence_bits long
+    and has grown by at least half the expected drift of the map since the
+    start. Maps without a positive drift (a < 4) are never cut short.
+
+    `known` (from known_cycle_index) holds cycles that are already known;
+    an orbit that steps onto one is completed from it instead of running
+    a full lap. The result is the same as without it.
+    """
     orbit = []
     seen = {}
     steps = 0
+    known = known or {}
+
+    drift = expected_drift(a) if a > 0 else 0
+    check_mask = DIVERGENCE_CHECK_INTERVAL - 1 if drift > 0 else -1
+    start_bits = n.bit_length()
 
     while n not in seen and steps < max_steps:
+        if n in known:
+            cycle, i = known[n]
+            if steps + len(cycle) >= max_steps:
+                return None
+            orbit.extend(cycle[i:] + cycle[:i])
+            return orbit, steps
+
         seen[n] = steps
         orbit.append(n)
         if n % 2 == 0:
@@ -16,42 +94,87 @@ def collatz_like_map(a, b, n, max_steps=5000):
             n = a * n + b
         steps += 1
 
+        if steps & check_mask == 0:
+            bits = n.bit_length()
+            if bits >= divergence_bits and bits - start_bits >= drift * steps / 2:
+                return DIVERGED
+
     if steps >= max_steps:
         return None
 
     return orbit, seen[n]
 
 
+def seed_outcome(a, b, n, max_steps, known=None):
+    """The normalized cycle n ends in, DIVERGED, or None if undecided."""
+    res = collatz_like_map(a, b, n, max_steps=max_steps, known=known)
+    if res is None or res is DIVERGED:
+        return res
+
+    orbit, cycle_start = res
+    return canonical_cycle(orbit[cycle_start:])
+
+
 def analyze_single_a(args):
     """
-    Worker function: analyzes one a for fixed b.
-    Returns (a, converging_seeds, cycles)
+    Worker function: analyzes one a for fixed b (or a chunk of its seeds),
+    given the cycles of the map that are already in the catalog.
+    Returns (a, b, converging_seeds, cycles, diverging_seeds, (seeds, seconds))
     """
-    a, b, odd_seeds, max_steps = args
+    a, b, odd_seeds, max_steps, known_cycles = args
+    started = time.perf_counter()
+    known = known_cycle_index(known_cycles)
+
+    if lane_engine is not None and len(odd_seeds) >= LANE_MIN_SEEDS:
+        outcomes = lane_engine.lane_outcomes(
+            a, b, odd_seeds, max_steps, partial(seed_outcome, known=known),
+            known_cycles=known_cycles,
+        )
+    else:
+        outcomes = (
+            seed_outcome(a, b, n, max_steps, known) for n in odd_seeds
+        )
 
     converging_seeds = []
+    diverging_seeds = []
     cycles = []
     cycle_reprs = set()
 
-    for n in odd_seeds:
-        res = collatz_like_map(a, b, n, max_steps=max_steps)
-        if res is None:
+    for n, outcome in zip(odd_seeds, outcomes):
+        if outcome is None:
+            continue
+        if outcome is DIVERGED:
+            diverging_seeds.append(n)
             continue
 
-        orbit, cycle_start = res
-        cycle = orbit[cycle_start:]
+        if outcome not in cycle_reprs:
+            cycle_reprs.add(outcome)
+            cycles.append((outcome, n))
 
-        m = min(cycle)
-        i = cycle.index(m)
-        cycle_norm = tuple(cycle[i:] + cycle[:i])
+        converging_seeds.append(n)
 
-        if cycle_norm not in cycle_reprs:
-            cycle_reprs.add(cycle_norm)
-            cycles.append((cycle_norm, n))
+    elapsed = time.perf_counter() - started
+    return a, b, converging_seeds, cycles, diverging_seeds, (len(odd_seeds), elapsed)
 
-        converging_seeds.append(n)
 
-    return a, converging_seeds, cycles
+def merge_chunks(results):
+    """
+    Combine the results of the seed chunks of one map into
+    (a, b, converging_seeds, cycles, diverging_seeds), exactly as if the
+    map had been analyzed in one task.
+    """
+    a, b = results[0][0], results[0][1]
+    converging_seeds = sorted(n for res in results for n in res[2])
+    diverging_seeds = sorted(n for res in results for n in res[4])
+
+    first_seed = {}
+    for res in results:
+        for cycle, seed in res[3]:
+            if cycle not in first_seed or seed < first_seed[cycle]:
+                first_seed[cycle] = seed
+    cycles = sorted(first_seed.items(), key=lambda item: item[1])
+
+    return a, b, converging_seeds, cycles, diverging_seeds
 
 
 def analyze_maps_for_b_parallel(
@@ -62,67 +185,180 @@ def analyze_maps_for_b_parallel(
     x_max=1000,
     max_steps=5000,
     processes=None,
+    skip_as=(),
+    model=None,
 ):
-    odd_as = [a for a in range(a_min, a_max + 1) if a % 2 == 1]
+    odd_as = [
+        a for a in range(a_min, a_max + 1)
+        if a % 2 == 1 and a not in skip_as
+    ]
     odd_seeds = [n for n in range(x_min, x_max + 1) if n % 2 == 1]
+    processes = processes or mp.cpu_count()
+    model = model or CostModel(prior=expected_steps)
 
-    tasks = [
-        (a, b, odd_seeds, max_steps)
-        for a in odd_as
-    ]
+    with CycleCatalog() as catalog:
+        tasks = [
+            (a, b, chunk, max_steps, catalog.cycles(a, b))
+            for a, chunk, _ in plan_b(odd_as, b, odd_seeds, max_steps, model, processes)
+        ]
+
+    chunks = {}
+    with mp.Pool(processes=processes) as pool:
+        for res in pool.imap_unordered(analyze_single_a, tasks):
+            chunks.setdefault(res[0], []).append(res)
 
     converging_seeds = {}
     cycles = {}
+    diverging_seeds = {}
+    for a, results in chunks.items():
+        _, _, converging_seeds[a], cycles[a], diverging_seeds[a] = merge_chunks(results)
 
-    with mp.Pool(processes=processes) as pool:
-        for a, seeds, cyc in pool.imap_unordered(analyze_single_a, tasks):
-            converging_seeds[a] = seeds
-            cycles[a] = cyc
+    return converging_seeds, cycles, diverging_seeds
 
-    return converging_seeds, cycles
 
+def iter_tasks(store, catalog, model, odd_as, odd_seeds, max_steps, pending, parts,
+               processes, first_b=1, b_step=2):
+    """
+    Endless stream of tasks, one b after another, each carrying the
+    catalogued cycles of its map.
+
+    Within a b, tasks come in longest-processing-time order from the cost
+    model, with expensive maps split into seed chunks (the number of chunks
+    of each map goes into `parts`). The cheap tasks of b fill in behind
+    the expensive ones while those of the next b are already running.
+    Maps already in the store are skipped.
+    """
+    b = store.resume_b(odd_as, first_b=first_b, b_step=b_step)
+
+    while True:
+        done = store.completed_as(b)
+        todo = [a for a in odd_as if a not in done]
+        if todo:
+            if done:
+                print(f"Resuming analysis for b = {b} ({len(done)} maps already stored)")
+            else:
+                print(f"Starting analysis for b = {b}")
+            pending[b] = len(todo)
+            for a, chunk, n_parts in plan_b(todo, b, odd_seeds, max_steps, model, processes):
+                parts[(a, b)] = n_parts
+                yield (a, b, chunk, max_steps, catalog.cycles(a, b))
+        b += b_step
+
+
+def write_results(db_path, results, model, pending, parts, x_min, x_max, max_steps,
+                  batch_size=64):
+    """
+    Writer thread: drains finished tasks from the queue, merges the chunks
+    of split maps, and stores complete maps, their cycles (also in the cycle
+    catalog) and the task timings in batched transactions, until it
+    receives None. Timings also go into the live cost model.
+    """
+    chunks = {}
+
+    with ResultsStore(db_path) as store, CycleCatalog() as catalog:
+        finished = False
+        while not finished:
+            batch = [results.get()]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(results.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                finished = True
+                batch = [item for item in batch if item is not None]
+            if not batch:
+                continue
+
+            complete = []
+            timings = []
+            for res in batch:
+                a, b, (n_seeds, seconds) = res[0], res[1], res[5]
+                model.observe(a, n_seeds, seconds)
+                timings.append((a, b, n_seeds, seconds))
+
+                map_chunks = chunks.setdefault((a, b), [])
+                map_chunks.append(res)
+                if len(map_chunks) == parts[(a, b)]:
+                    complete.append(merge_chunks(map_chunks))
+                    del chunks[(a, b)], parts[(a, b)]
+
+            store.record_timings(timings)
+            if not complete:
+                continue
+
+            store.record_maps(complete, x_min, x_max, max_steps)
+            for a, b, _, cycles, _ in complete:
+                for cycle, _ in cycles:
+                    catalog.add(a, b, cycle)
+            catalog.flush()
+
+            for _, b, _, _, _ in complete:
+                pending[b] -= 1
+                if pending[b] == 0:
+                    del pending[b]
+                    print(f"Finished b = {b}")
+
+
+def main(db_path="map_results.db"):
+    a_min, a_max = 3, 127
+    x_min, x_max = 1, 1000
+    max_steps = 5000
+    processes = mp.cpu_count()  # use all CPU cores
+
+    odd_as = [a for a in range(a_min, a_max + 1) if a % 2 == 1]
+    odd_seeds = [n for n in range(x_min, x_max + 1) if n % 2 == 1]
 
-def write_results_to_file(b, converging_seeds, cycles):
-    filename = f"b = {b}.txt"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(f"Results for maps f(x) = a*x + {b}\n")
-        f.write("=" * 50 + "\n\n")
+    # Keep a few tasks queued per core so no worker waits for the next
+    # task, without materializing the endless task stream.
+    in_flight = threading.BoundedSemaphore(4 * processes)
+    results = queue.Queue()
+    pending = {}  # b -> maps not yet stored
+    parts = {}    # (a, b) -> number of seed chunks
 
-        for a in sorted(converging_seeds):
-            f.write(f"Map f(x) = {a}*x + {b}\n")
-            f.write(f"Converging odd seeds ({len(converging_seeds[a])}):\n")
-            f.write(f"{converging_seeds[a]}\n")
+    with ResultsStore(db_path) as store:
+        model = CostModel(store.timings(), prior=expected_steps)
 
-            f.write(f"Cycles ({len(cycles[a])}):\n")
-            for cycle, seed in cycles[a]:
-                f.write(f"  Seed {seed} -> cycle {list(cycle)}\n")
-            f.write("\n")
+    def on_result(res):
+        results.put(res)
+        in_flight.release()
 
+    def on_error(exc):
+        print(f"Task failed: {exc!r}")
+        in_flight.release()
 
-def main():
-    b = 1
+    writer = threading.Thread(
+        target=write_results,
+        args=(db_path, results, model, pending, parts, x_min, x_max, max_steps),
+    )
+    writer.start()
 
+    pool = mp.Pool(processes=processes)
     try:
-        while True:
-            print(f"Starting analysis for b = {b}")
-
-            converging_seeds, cycles = analyze_maps_for_b_parallel(
-                b=b,
-                a_min=3,
-                a_max=127,
-                x_min=1,
-                x_max=1000,
-                max_steps=5000,
-                processes=None,  # None = use all CPU cores
+        with ResultsStore(db_path) as store, CycleCatalog() as catalog:
+            tasks = iter_tasks(
+                store, catalog, model, odd_as, odd_seeds, max_steps,
+                pending, parts, processes,
             )
-
-            write_results_to_file(b, converging_seeds, cycles)
-            b += 2
+            for task in tasks:
+                in_flight.acquire()
+                pool.apply_async(
+                    analyze_single_a, (task,),
+                    callback=on_result, error_callback=on_error,
+                )
 
     except KeyboardInterrupt:
-        print("\nInterrupted by user. Exiting cleanly.")
+        print("\nInterrupted by user. Saving finished maps and exiting.")
         sys.exit(0)
 
+    finally:
+        try:
+            pool.terminate()
+            pool.join()
+        finally:
+            results.put(None)
+            writer.join()
+
 
 if __name__ == "__main__":
     mp.freeze_support()  # important for Windows
@@ -3,6 +3,12 @@
 This program takes in a choice of xa+b
 and outputs the two classic graphs, stopping times and max values
 
+Run it without arguments to be asked for the map, or as
+    python graphs.py a b N [--out FILE] [--figures PREFIX]
+to compute the landscape without prompting and save it as arrays, or as
+    python graphs.py --atlas-a 3 5 --atlas-b 1 -1 --atlas-up-to N
+for thumbnails of a whole grid of maps (see python graphs.py --help).
+
 Orion Haunstrup
 Winter Break 2018-2019
 """
@@ -17,8 +23,18 @@ global fate_unknown_cutoff
 fate_unknown_cutoff = 10000000
 
 
-from math import log
+from fractions import Fraction
+from math import gcd, log
+from pathlib import Path
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
 
 
 def create_colors_list():
@@ -60,25 +76,69 @@ def create_colors_list():
 
 
 
-def ev_int(times_int, plus_int, n, known_loop_seeds):
-    """ A function that fires a single hailstone. This version is the one
-        to use when times & plus are integers. It returns a results list:
+def join_resolved(n, num_steps, _max, resolved_result):
+    """ Once a hailstone started at n reaches a value whose results are
+        already known (resolved_result, without the leading n), the results
+        for n follow from them and from the path so far: num_steps steps
+        long and peaking at _max."""
+
+    if resolved_result[0] != "loop":
+        return [n] + resolved_result
+    which_loop_seed, num_steps_from_there, max_from_there = resolved_result[1:]
+    return [n, "loop", which_loop_seed, num_steps + num_steps_from_there,
+            max(_max, max_from_there)]
+
+
+
+def compile_rational_map(times_str, plus_str):
+    """ Compiles xa+b, with a and b given as strings (integers or decimals,
+        e.g. "3" and "1", or "1.5" and "0.5"), into integers
+        (times, plus, divide) such that an odd n goes to
+        (n*times + plus)//divide*2. That is times*n + plus, with times and
+        plus the exact values of a and b, rounded down to an even number.
+        For integer a and b this is (a, b, 2).
+        Doing this once per map means no hailstone ever parses or rounds."""
+
+    times = Fraction(times_str)
+    plus = Fraction(plus_str)
+    scale = times.denominator * plus.denominator // gcd(
+        times.denominator, plus.denominator)
+    return (int(times * scale), int(plus * scale), 2 * scale)
+
+
+
+def ev_compiled(compiled_map, n, known_loop_seeds, resolved=None):
+    """ A function that fires a single hailstone of a map compiled by
+        compile_rational_map. It returns a results list:
         [n, "loop", which_loop_seed, num_steps, max_value]
         or [n, "div"]
-        or [n, "fate_unknown"]"""
+        or [n, "fate_unknown"]
+
+        known_loop_seeds is the set of loop seeds (the smallest number of
+        each loop) found so far; a newly found loop adds its seed to it.
+
+        resolved (optional) maps values to their results lists without the
+        leading n, e.g. the hailstone dictionary of the smaller ns. The
+        hailstone stops at the first value found in it."""
     
 
+    times, plus, divide = compiled_map
     _max = n
     num_steps = 0
     b = n
     already_hit_its_loop_seed = False
-    check_for_loop_checkpoint = 50
-    nums_to_test_for_repeat = []
-    on_the_heels_of_a_new_loop_seed = False
-    collecting_dish_for_the_new_loop = []
+    path = []
+    saved_b, saved_at = None, 0
+    ## The path so far, and the value it had at the last power-of-two
+    ## step: coming back to that value means a whole loop has gone by
 
     while True:
 
+        if resolved is not None and already_hit_its_loop_seed is False:
+            if b in resolved:
+                ## b's fate is already known, so n's follows from it
+                return join_resolved(n, num_steps, _max, resolved[b])
+
         if b in known_loop_seeds:
             if already_hit_its_loop_seed is False:
                 result_which_loop_seed = b
@@ -91,31 +151,17 @@ def ev_int(times_int, plus_int, n, known_loop_seeds):
                 return [n, "loop", result_which_loop_seed,
                         result_num_steps, result_max_value]
 
-        if on_the_heels_of_a_new_loop_seed is False:
-        ## A section seeing if it's in a new not-yet-discovered loop?
-            if b in nums_to_test_for_repeat:
-                ## Meaning that b is a repeat!
-                on_the_heels_of_a_new_loop_seed = True
-        else:
-        ## A section discussing what to do if it IS in a new
-                ## not-yet-discovered loop
-            if b in collecting_dish_for_the_new_loop:
-                ##Meaning that we've collected the full new loop
-                new_loop_seed = min(collecting_dish_for_the_new_loop)
-                known_loop_seeds.append(new_loop_seed)
-                return ev_int(times_int, plus_int, n, known_loop_seeds)
-            collecting_dish_for_the_new_loop.append(b)
-
-        if num_steps == check_for_loop_checkpoint:
-            nums_to_test_for_repeat.append(b)
-            if len(nums_to_test_for_repeat) == 3:
-                nums_to_test_for_repeat = nums_to_test_for_repeat[-2:]
-                #For speed, we trim the list down to just 2 numbers to check
-            if str(num_steps)[0] == "5":
-                check_for_loop_checkpoint = check_for_loop_checkpoint * 4
-            else:
-                check_for_loop_checkpoint = check_for_loop_checkpoint * 25 // 10
-            #check_for_loop_checkpoints = [50, 200, 500, 2000, 5000, 20000, ...]
+        if already_hit_its_loop_seed is False:
+            if b == saved_b:
+                ## Meaning that b is a repeat, and path[saved_at:] is
+                ## a new not-yet-discovered loop
+                new_loop_seed = min(path[saved_at:])
+                known_loop_seeds.add(new_loop_seed)
+                return [n, "loop", new_loop_seed,
+                        path.index(new_loop_seed), _max]
+            if num_steps & (num_steps - 1) == 0:
+                saved_b, saved_at = b, num_steps
+            path.append(b)
 
 
         if b > divergence_cutoff:
@@ -127,11 +173,11 @@ def ev_int(times_int, plus_int, n, known_loop_seeds):
             return [n, "fate_unknown"]
 
 
-        # The simple integer version
+        # Always in integers, even for a non-integer map
         if b % 2 == 0:
             b = b//2
         else:
-            b = (b*times_int+plus_int)//2*2
+            b = (b*times+plus)//divide*2
 
         num_steps += 1
         if b > _max:
@@ -139,129 +185,529 @@ def ev_int(times_int, plus_int, n, known_loop_seeds):
 
 
 
-def ev_non_int(times_str, plus_str, n, known_loop_seeds):
-    """ A function that fires a single hailstone. This version is the one
-        to use when either times or plus is a non-integer. To make sure there
-        is never any rounding and so that it can run with extreme precision,
-        all numbers are always kept in string or integer form, never evaluated
-        as floats. Enter times_str and plus_str as strings with a decimal point.
-        
-        The function returns a results list:
-        [n, "loop", which_loop_seed, num_steps, max_value]
-        or [n, "div"]
-        or [n, "fate_unknown"]"""
+def ev_int(times_int, plus_int, n, known_loop_seeds, resolved=None):
+    """ ev_compiled for integer times & plus."""
 
+    return ev_compiled((times_int, plus_int, 2), n, known_loop_seeds,
+                       resolved)
 
-    # This is a section I added more recently
-            # so the ev function will always be performing its
-            # operations on integers... eliminating the
-            # "rounding of enormous floats" problem that used to
-            # occur past 10^12
 
 
-    times_str_split = times_str.split(".")
-    times_digits_after_decim = len(times_str_split[1])
-    plus_str_split = plus_str.split(".")
-    plus_digits_after_decim = len(plus_str_split[1])
-    
-    if times_digits_after_decim < plus_digits_after_decim:
-        zeros_to_add = plus_digits_after_decim - times_digits_after_decim
-        times_str_split[1] += zeros_to_add * "0"
-
-    if plus_digits_after_decim < times_digits_after_decim:
-        zeros_to_add = times_digits_after_decim - plus_digits_after_decim
-        plus_str_split[1] += zeros_to_add * "0"
-
-    decimal_places_moved = max(
-        times_digits_after_decim, plus_digits_after_decim)
-
-    if eval(times_str_split[0]) == 0:
-        times_combined_str = times_str_split[0] + times_str_split[1]
-        while times_combined_str[0] == "0":
-            times_combined_str = times_combined_str[1:]
-        times_as_an_int = eval(times_combined_str)
+def ev_non_int(times_str, plus_str, n, known_loop_seeds, resolved=None):
+    """ ev_compiled for times & plus given as strings, where either may be a
+        non-integer. This compiles the map on every call; to fire many
+        hailstones, compile it once with compile_rational_map and use
+        ev_compiled or ev_many."""
+
+    return ev_compiled(compile_rational_map(times_str, plus_str), n,
+                       known_loop_seeds, resolved)
+
+
+
+def ev_many(compiled_map, ns, known_loop_seeds=None,
+            hailstone_dictionary=None):
+    """ Fires the hailstones ns of a compiled map and returns their results
+        lists. Every result goes into hailstone_dictionary (without the
+        leading n), so later hailstones stop as soon as they reach an
+        earlier n; giving the ns in increasing order makes the most of it.
+        New loop seeds are added to known_loop_seeds."""
+
+    if known_loop_seeds is None:
+        known_loop_seeds = set()
+    if hailstone_dictionary is None:
+        hailstone_dictionary = {}
+
+    results = []
+    for n in ns:
+        result = ev_compiled(compiled_map, n, known_loop_seeds,
+                             hailstone_dictionary)
+        hailstone_dictionary[n] = result[1:]
+        results.append(result)
+    return results
+
+
+
+## The ns below this are fired one after another before the rest of the
+## range is split across processes; every worker starts from their results
+first_chunk_size = 2 ** 16
+
+## Above this many points the graphs are drawn as density images, whose
+## cost depends on the image size instead of on the number of points
+scatter_point_limit = 200000
+density_image_size = (800, 600)
+
+## Per-worker copy of what every chunk starts from, set by init_worker
+worker_state = {}
+
+
+def init_worker(compiled_map, base_dictionary, base_loop_seeds):
+    worker_state.update(compiled_map=compiled_map,
+                        hailstone_dictionary=dict(base_dictionary),
+                        known_loop_seeds=set(base_loop_seeds))
+
+
+def landscape_chunk(bounds):
+    """ Worker function: fires the hailstones lo, ..., hi - 1 and returns
+        (lo, their results lists without the leading n, loop seeds).
+        Loops are discovered locally. Each worker keeps the hailstone
+        dictionary and loop seeds of the first chunk and of every chunk
+        it has fired so far."""
+
+    lo, hi = bounds
+    known_loop_seeds = worker_state["known_loop_seeds"]
+    results = ev_many(worker_state["compiled_map"], range(lo, hi),
+                      known_loop_seeds, worker_state["hailstone_dictionary"])
+    return lo, [result[1:] for result in results], known_loop_seeds
+
+
+
+def build_landscape(compiled_map, up_to_what_n, processes=None,
+                    progress=None):
+    """ Fires the hailstones n = 1, ..., up_to_what_n - 1 of a map compiled
+        by compile_rational_map.
+
+        The first chunk of ns is fired here (the whole range if there is
+        only one process); the rest of the range is split into chunks that
+        are fired in parallel, each discovering loops on its own. A loop seed is the smallest number of its loop, whichever
+        hailstone found it, so the seeds of all chunks simply merge and
+        loop colours stay the same as in a serial run.
+
+        Returns (columns, known_loop_seeds), where columns holds the lists
+        "fate", "which_loop_seed", "num_steps" and "max_value", indexed by
+        n - 1 (None where the fate is not "loop").
+        progress(fraction_done) is called as the chunks finish."""
+
+    processes = processes or mp.cpu_count()
+    if processes == 1:
+        first_hi = up_to_what_n
     else:
-        times_as_an_int = eval(times_str_split[0] + times_str_split[1])
-    if eval(plus_str_split[0]) == 0:
-        plus_combined_str = plus_str_split[0] + plus_str_split[1]
-        while plus_combined_str[0] == "0":
-            plus_combined_str = plus_combined_str[1:]
-        plus_as_an_int = eval(plus_combined_str)
+        first_hi = min(first_chunk_size, up_to_what_n)
+    total = max(up_to_what_n - 1, 1)
+
+    hailstone_dictionary = {}
+    known_loop_seeds = set()
+    results = [result[1:] for result in ev_many(
+        compiled_map, range(1, first_hi), known_loop_seeds,
+        hailstone_dictionary)]
+    #Note that this adds new loop seeds to known_loop_seeds
+    #Every hailstone stops as soon as it reaches a smaller n
+    if progress is not None:
+        progress(len(results) / total)
+
+    if first_hi < up_to_what_n:
+        chunk_size = max(1, -(-(up_to_what_n - first_hi) // (processes * 8)))
+        chunks = [(lo, min(lo + chunk_size, up_to_what_n))
+                  for lo in range(first_hi, up_to_what_n, chunk_size)]
+
+        done = len(results)
+        results.extend([None] * (up_to_what_n - first_hi))
+        with mp.Pool(processes, initializer=init_worker,
+                     initargs=(compiled_map, hailstone_dictionary,
+                               known_loop_seeds)) as pool:
+            for lo, chunk_results, chunk_loop_seeds in pool.imap_unordered(
+                    landscape_chunk, chunks):
+                results[lo - 1:lo - 1 + len(chunk_results)] = chunk_results
+                known_loop_seeds |= chunk_loop_seeds
+                done += len(chunk_results)
+                if progress is not None:
+                    progress(done / total)
+
+    return results_to_columns(results), known_loop_seeds
+
+
+
+def results_to_columns(results):
+    """ Columns "fate", "which_loop_seed", "num_steps" and "max_value" of
+        results lists without the leading n (None where the fate is not
+        "loop")."""
+
+    columns = {"fate": [], "which_loop_seed": [], "num_steps": [],
+               "max_value": []}
+    for result in results:
+        columns["fate"].append(result[0])
+        if result[0] == "loop":
+            columns["which_loop_seed"].append(result[1])
+            columns["num_steps"].append(result[2])
+            columns["max_value"].append(result[3])
+        else:
+            columns["which_loop_seed"].append(None)
+            columns["num_steps"].append(None)
+            columns["max_value"].append(None)
+    return columns
+
+
+
+def pixel_bins(values, value_range, bins):
+    """ The bin of each value among `bins` equal bins over value_range, the
+        way np.histogram2d bins them (the last bin includes its right
+        edge), and whether the value is in the range at all."""
+
+    low, high = value_range
+    edges = np.linspace(low, high, bins + 1)
+    inside = (values >= low) & (values <= high)
+    index = np.zeros(len(values), dtype=int)
+    index[inside] = ((values[inside] - low) * (bins / (high - low))).astype(int)
+    index[index == bins] = bins - 1
+    ## Rounding can put a value next to an edge into the bin beside it
+    index -= values < edges[index]
+    index += (values >= edges[index + 1]) & (index < bins - 1)
+    return index, inside
+
+
+
+def density_image(xs, ys, class_ids, class_colors, x_range, y_range,
+                  size=density_image_size):
+    """ Bins the points (xs, ys) of every class into its own 2-D histogram,
+        all in one pass over the points, and composites them into one RGBA
+        image for imshow (origin "lower").
+        A pixel gets the count-weighted mean colour of the classes in it,
+        and is more opaque the more points it holds. Points outside the
+        ranges are left out, the way axis limits would clip them."""
+
+    width, height = size
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    class_ids = np.asarray(class_ids, dtype=int)
+
+    cols, x_inside = pixel_bins(xs, x_range, width)
+    rows, y_inside = pixel_bins(ys, y_range, height)
+    inside = x_inside & y_inside
+    pixels = rows[inside] * width + cols[inside]
+    class_ids = class_ids[inside]
+
+    ## Only the classes present get a histogram, so the cost does not
+    ## depend on the size of the palette
+    present = np.bincount(class_ids, minlength=len(class_colors)) > 0
+    class_index = np.cumsum(present)[class_ids] - 1
+    class_counts = np.bincount(
+        class_index * (height * width) + pixels,
+        minlength=present.sum() * height * width,
+    ).reshape(-1, height * width)
+    present_colors = np.array([to_rgb(color) for color, is_present
+                               in zip(class_colors, present) if is_present]
+                              ).reshape(-1, 3)
+    rgb = (class_counts.T @ present_colors).reshape(height, width, 3)
+    counts = class_counts.sum(axis=0).reshape(height, width)
+
+    image = np.zeros((height, width, 4))
+    filled = counts > 0
+    if filled.any():
+        image[filled, :3] = rgb[filled] / counts[filled, None]
+        image[filled, 3] = 0.35 + 0.65 * (
+            np.log1p(counts[filled]) / np.log1p(counts.max()))
+    return image
+
+
+
+def plot_density(xs, ys, class_ids, class_colors, y_range):
+    """ Draws the points on the current axes as a density image, one
+        histogram per colour class (so per loop seed, plus the divergent
+        and fate_unknown colours)."""
+
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    x_range = (xs.min() - 0.5, xs.max() + 0.5)
+    ## One histogram bin per screen pixel of the axes
+    bbox = plt.gca().get_window_extent()
+    size = (max(int(bbox.width), 1), max(int(bbox.height), 1))
+    image = density_image(xs, ys, class_ids, class_colors, x_range, y_range,
+                          size)
+    plt.imshow(image, origin="lower", aspect="auto", interpolation="nearest",
+               extent=(x_range[0], x_range[1], y_range[0], y_range[1]))
+
+
+
+## Codes of the "fate" array of a landscape
+fate_codes = {"loop": 0, "div": 1, "fate_unknown": 2}
+
+
+def landscape_arrays(columns, times_str, plus_str):
+    """ Turns the columns of build_landscape into NumPy arrays, indexed by
+        n - 1: "fate" (see fate_codes), "which_loop_seed", "num_steps" (-1
+        unless the fate is loop) and "max_value" (int64, or float64 if some
+        max value does not fit). "times" and "plus" hold the map."""
+
+    fates = columns["fate"]
+    max_values = [m if m is not None else 0 for m in columns["max_value"]]
+    try:
+        max_value = np.array(max_values, dtype=np.int64)
+    except OverflowError:
+        max_value = np.array([float(m) for m in max_values])
+
+    return {
+        "fate": np.array([fate_codes[f] for f in fates], dtype=np.int8),
+        "which_loop_seed": np.array(
+            [s if s is not None else 0 for s in columns["which_loop_seed"]],
+            dtype=np.int64),
+        "num_steps": np.array(
+            [t if t is not None else -1 for t in columns["num_steps"]],
+            dtype=np.int64),
+        "max_value": max_value,
+        "times": np.array(times_str),
+        "plus": np.array(plus_str),
+    }
+
+
+
+def save_landscape(path, landscape):
+    """ Saves landscape arrays as one .npz file if path ends in .npz, and
+        otherwise as a directory of .npy files that load_landscape can
+        memory-map."""
+
+    path = Path(path)
+    if path.suffix == ".npz":
+        np.savez(path, **landscape)
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    for name, values in landscape.items():
+        ## Written next to the old file and then swapped in, so arrays
+        ## still memory-mapped from the old file stay valid
+        tmp_file = path / (name + ".npy.tmp")
+        with open(tmp_file, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp_file, path / (name + ".npy"))
+
+
+
+def load_landscape(path):
+    """ Loads arrays saved by save_landscape. The arrays of a directory are
+        memory-mapped, so only the parts that are used are read."""
+
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as saved:
+            return {name: saved[name] for name in saved.files}
+    return {file.stem: np.load(file, mmap_mode="r")
+            for file in sorted(path.glob("*.npy"))}
+
+
+
+def landscape_points(landscape, colors_list):
+    """ The points of the two classic graphs of a landscape:
+        (ns, stopping times, max values, class_ids, class_colors), where
+        point i has colour class_colors[class_ids[i]]. Divergent and
+        fate_unknown entries go a little above the largest loop entry, in
+        neon pink and snot."""
+
+    fates = np.asarray(landscape["fate"])
+    loops = fates == fate_codes["loop"]
+    num_steps = np.asarray(landscape["num_steps"])
+    max_values = np.asarray(landscape["max_value"])
+    up_to_what_n = len(fates) + 1
+
+    ##Gets a little something ready to plot divergent entries
+    if loops.any():
+        max_stopping_time_up_to_that_n = num_steps[loops].max()
+        max_max_value_up_to_that_n = max_values[loops].max()
     else:
-        plus_as_an_int = eval(plus_str_split[0] + plus_str_split[1])
-    new_divide = eval("2" + decimal_places_moved * "0")
+        max_stopping_time_up_to_that_n = 0
+        max_max_value_up_to_that_n = 1
+    list_of_input_ns = np.arange(1, up_to_what_n)
+    list_of_stopping_times = np.where(
+        loops, num_steps, max_stopping_time_up_to_that_n * 1.1)
+                    ## a little above the maximum
+    list_of_max_values = np.where(
+        loops, max_values.astype(float), float(max_max_value_up_to_that_n) * 1.1)
 
+    ##Each n gets the colour of its loop seed, or the divergent or
+    ##fate_unknown colour
+    class_colors = colors_list + ["xkcd:neon pink", "xkcd:snot"]
+    class_ids = np.where(
+        loops, np.asarray(landscape["which_loop_seed"]) % len(colors_list),
+        np.where(fates == fate_codes["div"],
+                 len(colors_list), len(colors_list) + 1))
 
+    return (list_of_input_ns, list_of_stopping_times, list_of_max_values,
+            class_ids, class_colors)
 
-    _max = n
-    num_steps = 0
-    b = n
-    already_hit_its_loop_seed = False
-    check_for_loop_checkpoint = 50
-    nums_to_test_for_repeat = []
-    on_the_heels_of_a_new_loop_seed = False
-    collecting_dish_for_the_new_loop = []
 
-    while True:
 
-        if b in known_loop_seeds:
-            if already_hit_its_loop_seed is False:
-                result_which_loop_seed = b
-                result_num_steps = num_steps
-                already_hit_its_loop_seed = True
-            elif already_hit_its_loop_seed is True:
-                result_max_value = _max
-                #This is here, in case you like start x3+1 at n = 2
-                #You want it to return a max_value of 4, not 2
-                return [n, "loop", result_which_loop_seed,
-                        result_num_steps, result_max_value]
+def plot_landscape(landscape):
+    """ Draws the two classic graphs of a landscape in two new figures and
+        returns them."""
 
-        if on_the_heels_of_a_new_loop_seed is False:
-        ## A section seeing if it's in a new not-yet-discovered loop?
-            if b in nums_to_test_for_repeat:
-                ## Meaning that b is a repeat!
-                on_the_heels_of_a_new_loop_seed = True
-        else:
-        ## A section discussing what to do if it IS in a new
-                ## not-yet-discovered loop
-            if b in collecting_dish_for_the_new_loop:
-                ##Meaning that we've collected the full new loop
-                new_loop_seed = min(collecting_dish_for_the_new_loop)
-                known_loop_seeds.append(new_loop_seed)
-                return ev_non_int(
-                    times_str, plus_str, n, known_loop_seeds)
-            collecting_dish_for_the_new_loop.append(b)
-
-        if num_steps == check_for_loop_checkpoint:
-            nums_to_test_for_repeat.append(b)
-            if len(nums_to_test_for_repeat) == 3:
-                nums_to_test_for_repeat = nums_to_test_for_repeat[-2:]
-                #For speed, we trim the list down to just 2 numbers to check
-            if str(num_steps)[0] == "5":
-                check_for_loop_checkpoint = check_for_loop_checkpoint * 4
-            else:
-                check_for_loop_checkpoint = check_for_loop_checkpoint * 25 // 10
-            #check_for_loop_checkpoints = [50, 200, 500, 2000, 5000, 20000, ...]
+    (list_of_input_ns, list_of_stopping_times, list_of_max_values,
+     class_ids, class_colors) = landscape_points(landscape,
+                                                 create_colors_list())
+    up_to_what_n = len(list_of_input_ns) + 1
+    times_str, plus_str = str(landscape["times"]), str(landscape["plus"])
 
+    use_density = len(list_of_input_ns) > scatter_point_limit
+    if not use_density:
+        list_of_which_color = np.array(class_colors)[class_ids].tolist()
 
-        if b > divergence_cutoff:
-            return [n, "div"]
+    ##Plots it all
+    stopping_times_graph = plt.figure()
+    if use_density:
+        plot_density(list_of_input_ns, list_of_stopping_times, class_ids,
+                     class_colors,
+                     (0, max(list_of_stopping_times.max(), 1) * 1.02))
+    else:
+        plt.scatter(list_of_input_ns, list_of_stopping_times,
+                    s=1, c=list_of_which_color)
+    plt.xlabel("input n")
+    #plt.xscale('log')
+    plt.ylabel("stopping times")
+    plt.title("x" + times_str + "+" + plus_str + " Stopping Times Graph")
 
+    max_values_graph = plt.figure()
+    if use_density:
+        plot_density(list_of_input_ns, list_of_max_values, class_ids,
+                     class_colors, (1, 2*up_to_what_n))
+    else:
+        plt.scatter(list_of_input_ns, list_of_max_values,
+                    s=2, c=list_of_which_color)
+    plt.xlabel("input n")
+    #plt.xscale('log')
+    plt.ylabel("max values")
+    #plt.yscale('log')
+    plt.ylim(1, 2*up_to_what_n)
+    plt.title("x" + times_str + "+" + plus_str + " Max Value Graph")
 
-        if num_steps > fate_unknown_cutoff:
-            print(str(n) + " has fate_unknown")
-            return [n, "fate_unknown"]
+    return stopping_times_graph, max_values_graph
 
 
-        if b % 2 == 0:
-            b = b//2
-        else:
-            b = (b*times_as_an_int+plus_as_an_int)//(new_divide)*2
-                # This is the new version that always works in integers
 
-        num_steps += 1
-        if b > _max:
-            _max = b
+## Atlas mode: per-map landscape arrays are cached here, one directory of
+## .npy files per map, holding n = 1, ..., N for the largest N asked for
+atlas_cache_dir = "landscape_cache"
+atlas_thumbnail_size = (160, 120)
+
+
+class ResolvedPrefix(dict):
+    """ A hailstone dictionary whose ns 1, ..., len(landscape["fate"])
+        are answered from saved landscape arrays, and whose other entries
+        are kept as usual."""
+
+    def __init__(self, landscape):
+        super().__init__()
+        self.landscape = landscape
+        self.size = len(landscape["fate"])
+        self.fate_names = {code: fate for fate, code in fate_codes.items()}
+
+    def __contains__(self, n):
+        return (type(n) is int and 1 <= n <= self.size) or dict.__contains__(
+            self, n)
+
+    def __getitem__(self, n):
+        if type(n) is int and 1 <= n <= self.size:
+            fate = self.fate_names[int(self.landscape["fate"][n - 1])]
+            if fate != "loop":
+                return [fate]
+            return [fate, int(self.landscape["which_loop_seed"][n - 1]),
+                    int(self.landscape["num_steps"][n - 1]),
+                    int(self.landscape["max_value"][n - 1])]
+        return dict.__getitem__(self, n)
+
+
+
+def atlas_path(cache_dir, times_str, plus_str):
+    return Path(cache_dir) / ("x" + times_str + "+" + plus_str)
+
+
+
+def atlas_map(args):
+    """ Worker function: makes sure the cache holds the landscape of one
+        map for n = 1, ..., up_to_n, computing only the ns past what is
+        already cached. Returns (times_str, plus_str, number of ns fired)."""
+
+    times_str, plus_str, up_to_n, cache_dir = args
+    path = atlas_path(cache_dir, times_str, plus_str)
+    cached = load_landscape(path) if (path / "fate.npy").exists() else None
+    cached_n = len(cached["fate"]) if cached is not None else 0
+    if cached_n >= up_to_n:
+        return times_str, plus_str, 0
+
+    if cached is not None:
+        fates = np.asarray(cached["fate"])
+        seeds = np.asarray(cached["which_loop_seed"])
+        known_loop_seeds = set(
+            np.unique(seeds[fates == fate_codes["loop"]]).tolist())
+        hailstone_dictionary = ResolvedPrefix(cached)
+    else:
+        known_loop_seeds = set()
+        hailstone_dictionary = {}
+
+    results = ev_many(compile_rational_map(times_str, plus_str),
+                      range(cached_n + 1, up_to_n + 1), known_loop_seeds,
+                      hailstone_dictionary)
+    suffix = landscape_arrays(
+        results_to_columns([result[1:] for result in results]),
+        times_str, plus_str)
+    if cached is not None:
+        for name in ("fate", "which_loop_seed", "num_steps", "max_value"):
+            suffix[name] = np.concatenate([cached[name], suffix[name]])
+    save_landscape(path, suffix)
+    return times_str, plus_str, up_to_n - cached_n
+
+
+
+def build_atlas(a_values, b_values, up_to_n, cache_dir=atlas_cache_dir,
+                processes=None):
+    """ Landscapes of xa+b for every a in a_values and b in b_values, for
+        n = 1, ..., up_to_n, computed in parallel, one map per task (the
+        hailstones of one map run one after another, sharing their
+        hailstone dictionary). Returns {(a, b): landscape} with a and b as
+        strings, read from the cache."""
+
+    tasks = [(str(a), str(b), up_to_n, cache_dir)
+             for a in a_values for b in b_values]
+    with mp.Pool(processes) as pool:
+        for times_str, plus_str, fired in pool.imap_unordered(
+                atlas_map, tasks):
+            if fired:
+                print("x" + times_str + "+" + plus_str + ": fired", fired,
+                      "new hailstones")
+
+    atlas = {}
+    for times_str, plus_str, _, _ in tasks:
+        landscape = load_landscape(atlas_path(cache_dir, times_str, plus_str))
+        for name in ("fate", "which_loop_seed", "num_steps", "max_value"):
+            landscape[name] = landscape[name][:up_to_n]
+        atlas[(times_str, plus_str)] = landscape
+    return atlas
+
+
+
+def render_atlas(atlas, a_values, b_values, prefix,
+                 size=atlas_thumbnail_size):
+    """ Small multiples of an atlas, one density thumbnail per map (a down,
+        b across), saved as <prefix>_stopping_times.png and
+        <prefix>_max_values.png. Uses the Agg canvas, so no display is
+        needed."""
+
+    colors_list = create_colors_list()
+    a_values = [str(a) for a in a_values]
+    b_values = [str(b) for b in b_values]
+    dpi = 100
+    width = len(b_values) * size[0] / dpi
+    height = len(a_values) * (size[1] + 20) / dpi
+
+    for graph_index, graph_name in ((1, "stopping_times"), (2, "max_values")):
+        figure = Figure(figsize=(width, height), dpi=dpi)
+        FigureCanvasAgg(figure)
+        for row, times_str in enumerate(a_values):
+            for col, plus_str in enumerate(b_values):
+                points = landscape_points(atlas[(times_str, plus_str)],
+                                          colors_list)
+                ns, ys, class_ids, class_colors = (
+                    points[0], points[graph_index], points[3], points[4])
+                x_range = (0.5, len(ns) + 0.5)
+                if graph_index == 1:
+                    y_range = (0, max(ys.max(), 1) * 1.02)
+                else:
+                    y_range = (1, 2 * (len(ns) + 1))
+                ax = figure.add_subplot(len(a_values), len(b_values),
+                                        row * len(b_values) + col + 1)
+                ax.imshow(density_image(ns.astype(float), ys, class_ids,
+                                        class_colors, x_range, y_range, size),
+                          origin="lower", aspect="auto",
+                          interpolation="nearest")
+                ax.set_title("x" + times_str + "+" + plus_str, fontsize=7)
+                ax.set_xticks([])
+                ax.set_yticks([])
+        figure.tight_layout(pad=0.3)
+        figure.savefig(prefix + "_" + graph_name + ".png")
 
 
 
@@ -291,122 +737,100 @@ def main():
     up_to_what_n = eval(input("Up to what value of n?: ")) + 1
 
 
-    times_str_has_decimal = "." in times_str
-    plus_str_has_decimal = "." in plus_str
-
-    if times_str_has_decimal is False and plus_str_has_decimal is False:
-        times, plus = eval(times_str), eval(plus_str)
-        int_or_non = "int"
-    else:
-        ## Meaning that at least one of them is a float
-        if times_str_has_decimal is False:
-            times_str += ".0"
-        if plus_str_has_decimal is False:
-            plus_str += ".0"
-        int_or_non = "non"
-    
+    compiled_map = compile_rational_map(times_str, plus_str)
 
     print("Loading: ", end="")
     percent_loaded = 0
-        
 
-    ##Builds the Hailstone Dictionary
-    hailstone_dictionary = {}
-    known_loop_seeds = []
-    for n in range(1, up_to_what_n):
-        if int_or_non == "int":
-            hailstone_dictionary[n] = ev_int(
-                times, plus, n, known_loop_seeds)[1:]
-        else:
-            hailstone_dictionary[n] = ev_non_int(
-                times_str, plus_str, n, known_loop_seeds)[1:]
-        #Note that this function alters the known_loop_seeds list
-        if n >= (percent_loaded / 10 + 1) * (up_to_what_n - 1) / 10:
+    def show_progress(fraction_done):
+        nonlocal percent_loaded
+        while percent_loaded + 10 <= fraction_done * 100:
             percent_loaded += 10
-            print(str(percent_loaded) + "% ", end="")
+            print(str(percent_loaded) + "% ", end="", flush=True)
             ##Shows the user how far along it is...
 
+    columns, known_loop_seeds = build_landscape(
+        compiled_map, up_to_what_n, progress=show_progress)
+    plot_landscape(landscape_arrays(columns, times_str, plus_str))
 
-    ##Gets a little something ready to plot divergent entries
-    max_max_value_up_to_that_n = 0
-    max_stopping_time_up_to_that_n = 0
-    all_divergent = False
-    for n in range(1, up_to_what_n):
-        if hailstone_dictionary[n][0] == "loop":
-            if hailstone_dictionary[n][-1] > max_max_value_up_to_that_n:
-                max_max_value_up_to_that_n = hailstone_dictionary[n][-1]
-            if hailstone_dictionary[n][-2] > max_stopping_time_up_to_that_n:
-                max_stopping_time_up_to_that_n = hailstone_dictionary[n][-2]
-            all_divergent = True
-
-    if all_divergent is False:
-        max_stopping_time_up_to_that_n = 0
-        max_max_value_up_to_that_n = 1
+    print("\n\n\nWe found the following loop_seeds:")
+    print(sorted(known_loop_seeds))
 
+    plt.show()
 
-    ##Builds the various lists we'll need for plotting
-    list_of_input_ns = []
-    list_of_stopping_times = []
-    list_of_max_values = []
-    list_of_loops_encountered = []
-    list_of_which_color = []
-    colors_list = create_colors_list()
 
-    for n in range(1, up_to_what_n):
-        list_of_input_ns.append(n)
-        if hailstone_dictionary[n][0] == "loop":
-            list_of_stopping_times.append(hailstone_dictionary[n][-2])
-            list_of_max_values.append(hailstone_dictionary[n][-1])
-            loop_encountered = hailstone_dictionary[n][-3]
-            if loop_encountered not in list_of_loops_encountered:
-                list_of_loops_encountered.append(loop_encountered)
-            list_of_which_color.append(
-            colors_list[hailstone_dictionary[n][-3] % len(colors_list)])
-        if hailstone_dictionary[n][0] == "div":
-            list_of_stopping_times.append(max_stopping_time_up_to_that_n * 1.1)
-                    ## a little above the maximum
-            list_of_max_values.append(max_max_value_up_to_that_n * 1.1)
-            list_of_which_color.append("xkcd:neon pink")
-        if hailstone_dictionary[n][0] == "fate_unknown":
-            list_of_stopping_times.append(max_stopping_time_up_to_that_n * 1.1)
-                    ## a little above the maximum
-            list_of_max_values.append(max_max_value_up_to_that_n * 1.1)
-            list_of_which_color.append("xkcd:snot")
 
-    ##Plots it all
-    stopping_times_graph = plt.figure()
-    plt.scatter(list_of_input_ns, list_of_stopping_times,
-                s=1, c=list_of_which_color)
-    plt.xlabel("input n")
-    #plt.xscale('log')
-    plt.ylabel("stopping times")
-    if int_or_non == "int":
-        plt.title("x" + str(times) + "+" + str(plus) + " Stopping Times Graph")
+def batch_main(argv=None):
+    """ Non-interactive entry point: computes a landscape and saves its
+        arrays, or re-renders saved arrays, optionally to image files so it
+        can run without a display."""
+
+    parser = argparse.ArgumentParser(
+        description="Computes the stopping times, max values and loop seeds "
+                    "of xa+b for n = 1, ..., N and saves them as arrays.")
+    parser.add_argument("times", nargs="?", help="a in xa+b, e.g. 3 or 1.5")
+    parser.add_argument("plus", nargs="?", help="b in xa+b, e.g. 1 or 0.5")
+    parser.add_argument("up_to", nargs="?", type=int, help="largest n")
+    parser.add_argument("--out", help="a .npz file, or a directory for "
+                        "memory-mappable .npy files "
+                        "(default: x<a>+<b>_<N>.npz)")
+    parser.add_argument("--load", help="re-render a saved landscape "
+                        "instead of computing one")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--figures", help="save the graphs as "
+                        "<FIGURES>_stopping_times.png and "
+                        "<FIGURES>_max_values.png instead of showing them")
+    parser.add_argument("--atlas-a", nargs="+", metavar="A",
+                        help="atlas mode: the values of a")
+    parser.add_argument("--atlas-b", nargs="+", metavar="B",
+                        help="atlas mode: the values of b")
+    parser.add_argument("--atlas-up-to", type=int, metavar="N",
+                        help="atlas mode: largest n")
+    parser.add_argument("--cache", default=atlas_cache_dir,
+                        help="atlas mode: cache directory (default: "
+                        "%(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.atlas_a or args.atlas_b:
+        if not (args.atlas_a and args.atlas_b and args.atlas_up_to):
+            parser.error("atlas mode needs --atlas-a, --atlas-b and "
+                         "--atlas-up-to")
+        atlas = build_atlas(args.atlas_a, args.atlas_b, args.atlas_up_to,
+                            args.cache, args.processes)
+        prefix = args.figures or "atlas"
+        render_atlas(atlas, args.atlas_a, args.atlas_b, prefix)
+        print("Saved", prefix + "_stopping_times.png and",
+              prefix + "_max_values.png")
+        return
+
+    if args.load:
+        landscape = load_landscape(args.load)
     else:
-        if times_str_has_decimal is False:
-            times_str = times_str[:-2]
-        if plus_str_has_decimal is False:
-            plus_str = plus_str[:-2]
-        plt.title("x" + times_str + "+" + plus_str + " Stopping Times Graph")
-
-    max_values_graph = plt.figure()
-    plt.scatter(list_of_input_ns, list_of_max_values,
-                s=2, c=list_of_which_color)
-    plt.xlabel("input n")
-    #plt.xscale('log')
-    plt.ylabel("max values")
-    #plt.yscale('log')
-    plt.ylim(1, 2*up_to_what_n)
-    if int_or_non == "int":
-        plt.title("x" + str(times) + "+" + str(plus) + " Max Value Graph")
+        if args.up_to is None:
+            parser.error("give a, b and N, or --load")
+        columns, known_loop_seeds = build_landscape(
+            compile_rational_map(args.times, args.plus), args.up_to + 1,
+            processes=args.processes)
+        landscape = landscape_arrays(columns, args.times, args.plus)
+        out = args.out or "x{}+{}_{}.npz".format(args.times, args.plus,
+                                                 args.up_to)
+        save_landscape(out, landscape)
+        print("Saved to", out, "- loop seeds:", sorted(known_loop_seeds))
+        if not args.figures:
+            return
+
+    stopping_times_graph, max_values_graph = plot_landscape(landscape)
+    if args.figures:
+        stopping_times_graph.savefig(args.figures + "_stopping_times.png")
+        max_values_graph.savefig(args.figures + "_max_values.png")
     else:
-        plt.title("x" + times_str + "+" + plus_str + " Max Value Graph")
+        plt.show()
 
-    known_loop_seeds.sort()
-    print("\n\n\nWe found the following loop_seeds:")
-    print(known_loop_seeds)
-
-    plt.show()
 
 
-main()
+if __name__ == "__main__":
+    mp.freeze_support()  # important for Windows
+    if len(sys.argv) > 1:
+        batch_main()
+    else:
+        main()
@@ -0,0 +1,135 @@
+"""
+Vectorized lane engine for maps n -> n/2 (n even), a*n + b (n odd).
+
+Advances many seeds of one map together as int64 NumPy arrays, one lane
+per seed. A lane is retired when it reaches a known cycle, when its value
+would leave int64 (it is then handed to the big-int scalar path), or when
+it runs out of steps.
+
+The outcome of every seed is the same as that of the scalar path:
+a canonical cycle tuple, DIVERGED, or None if undecided.
+"""
+
+import numpy as np
+
+from cycle_catalog import canonical_cycle
+
+
+INT64_MAX = np.iinfo(np.int64).max
+
+
+def walk_cycle(a, b, n):
+    """The cycle through n, which must lie on a cycle of the map."""
+    cycle = [n]
+    m = n // 2 if n % 2 == 0 else a * n + b
+    while m != n:
+        cycle.append(m)
+        m = m // 2 if m % 2 == 0 else a * m + b
+    return canonical_cycle(cycle)
+
+
+def lane_outcomes(a, b, seeds, max_steps, scalar, known_cycles=()):
+    """
+    Outcome of every seed in `seeds`, in order. `scalar(a, b, n, max_steps)`
+    is the big-int path that gives the outcome of a single seed, and
+    `known_cycles` are canonical cycles of the map known in advance.
+
+    Cycles are found with Brent's algorithm, which is the same for every
+    lane because all active lanes have taken the same number of steps:
+    the value at each power-of-two step is saved and a lane whose value
+    matches its saved value is on a cycle. Once a cycle is known its
+    elements are looked up for every lane on every step, so the step at
+    which a lane enters it is exact and the outcome matches the scalar
+    path. Lanes whose entry step is not exact (those already on a cycle
+    when it was found, and those still running at max_steps) are re-run
+    on the scalar path, as are lanes that would overflow int64.
+    """
+    if not len(seeds):
+        return []
+
+    limit = (INT64_MAX - abs(b)) // max(abs(a), 1)
+    if max(max(seeds), -min(seeds)) > limit:
+        return [scalar(a, b, n, max_steps) for n in seeds]
+
+    x = np.array(seeds, dtype=np.int64)
+    lane = np.arange(len(seeds))
+    result = np.full(len(seeds), -1)   # lane -> cycle id, -1 if none
+
+    cycles = []                        # cycle id -> canonical cycle
+    lengths = np.empty(0, dtype=np.int64)
+    added_at = np.empty(0, dtype=np.int64)
+    known_vals = np.empty(0, dtype=np.int64)
+    known_ids = np.empty(0, dtype=np.int64)
+    fallback = []
+
+    def add_cycle(cycle, t):
+        nonlocal lengths, added_at, known_vals, known_ids
+        cycle_id = len(cycles)
+        cycles.append(cycle)
+        lengths = np.append(lengths, len(cycle))
+        added_at = np.append(added_at, t)
+        vals = np.concatenate([known_vals, np.array(cycle, dtype=np.int64)])
+        ids = np.concatenate([known_ids, np.full(len(cycle), cycle_id)])
+        order = np.argsort(vals)
+        known_vals, known_ids = vals[order], ids[order]
+
+    for cycle in known_cycles:
+        if max(cycle) <= INT64_MAX and min(cycle) >= -INT64_MAX:
+            add_cycle(tuple(cycle), -2)
+
+    saved = ~x  # equal to no lane until the first save at step 0
+    t = 0
+    while len(x):
+        retire = np.zeros(len(x), dtype=bool)
+
+        # Lanes that reached a known cycle. A cycle added after the check
+        # of step s is first looked up at step s + 1, so a lane caught at
+        # step t >= s + 2 entered it exactly at t.
+        if len(known_vals):
+            pos = np.minimum(np.searchsorted(known_vals, x), len(known_vals) - 1)
+            hit = np.flatnonzero(known_vals[pos] == x)
+            if len(hit):
+                ids = known_ids[pos[hit]]
+                exact = (added_at[ids] + 2 <= t) | (t == 0)
+                # The scalar path repeats at entry step + cycle length
+                ok = exact & (t + lengths[ids] < max_steps)
+                result[lane[hit[ok]]] = ids[ok]
+                fallback.extend(lane[hit[~exact]])
+                retire[hit] = True
+
+        # Lanes that came back to their saved value are on a new cycle
+        found = np.flatnonzero((x == saved) & ~retire)
+        for i in found:
+            if retire[i]:
+                continue
+            add_cycle(walk_cycle(a, b, int(x[i])), t)
+            on_cycle = np.isin(x, cycles[-1]) & ~retire
+            fallback.extend(lane[on_cycle])
+            retire |= on_cycle
+
+        if t & (t - 1) == 0:
+            saved = x.copy()
+
+        if t == max_steps:
+            fallback.extend(lane[~retire])
+            break
+
+        # Lanes about to leave int64 go to the scalar path
+        odd = (x & 1).astype(bool)
+        overflow = odd & (np.abs(x) > limit) & ~retire
+        if overflow.any():
+            fallback.extend(lane[overflow])
+            retire |= overflow
+
+        if retire.any():
+            keep = ~retire
+            x, lane, saved, odd = x[keep], lane[keep], saved[keep], odd[keep]
+
+        x = np.where(odd, a * x + b, x >> 1)
+        t += 1
+
+    outcomes = [cycles[c] if c >= 0 else None for c in result.tolist()]
+    for i in fallback:
+        outcomes[i] = scalar(a, b, seeds[i], max_steps)
+
+    return outcomes
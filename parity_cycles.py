@@ -0,0 +1,113 @@
+"""
+Algebraic cycle enumeration for maps n -> n/2 (n even), a*n + b (n odd).
+
+Instead of simulating seeds, every parity vector up to length L is
+enumerated. After the steps of a vector with j odd and k even steps the
+value is (a^j * n + c) / 2^k, so the vector closes into a cycle exactly
+when n * (2^k - a^j) = c has a positive integer solution. This finds every
+cycle of length <= L, including cycles whose elements are all larger than
+any seed a sweep would try.
+"""
+
+import sys
+import multiprocessing as mp
+
+from cycle_catalog import CycleCatalog, canonical_cycle
+
+
+def _close_cycle(a, b, n, length):
+    """The cycle through n if n returns to itself after `length` steps."""
+    orbit = [n]
+    m = n
+    for _ in range(length):
+        m = m // 2 if m % 2 == 0 else a * m + b
+        if m == n:
+            return canonical_cycle(orbit)
+        orbit.append(m)
+    return None
+
+
+def cycles_of_length(args):
+    """
+    Worker function: all cycles whose parity vector has length L.
+
+    Vectors are rotated to start with an odd step (every positive cycle
+    has an odd element). When a and b are both odd, a*n + b is even, so an
+    odd step is always followed by an even one, cyclically. For b > 0 the
+    constant c is positive, so a branch is cut as soon as even all-even
+    remaining steps could not make 2^k exceed a^j.
+    Returns (L, cycles).
+    """
+    a, b, L = args
+    forced_even = a % 2 == 1 and b % 2 == 1
+    solutions = set()
+
+    # (depth, a^j, c, k, last step was odd)
+    stack = [(1, a, b, 0, True)]
+    while stack:
+        depth, A, C, K, last_odd = stack.pop()
+        remaining = L - depth
+
+        if b > 0 and (1 << (K + remaining)) <= A:
+            continue
+
+        if remaining == 0:
+            if forced_even and last_odd:
+                continue  # would be followed by the leading odd step
+            D = (1 << K) - A
+            if D != 0 and C % D == 0 and C // D > 0:
+                solutions.add(C // D)
+            continue
+
+        stack.append((depth + 1, A, C, K + 1, False))
+        if not (forced_even and last_odd):
+            stack.append((depth + 1, A * a, C * a + (b << K), K, True))
+
+    cycles = set()
+    for n in solutions:
+        cycle = _close_cycle(a, b, n, L)
+        if cycle is not None:
+            cycles.add(cycle)
+
+    return L, cycles
+
+
+def find_cycles(a, b, max_length, processes=None):
+    """
+    Every cycle of the map with at most max_length elements, sorted by
+    length and smallest element. Lengths are searched in parallel, longest
+    (most expensive) first.
+    """
+    tasks = [(a, b, L) for L in range(max_length, 0, -1)]
+    cycles = set()
+
+    with mp.Pool(processes=processes) as pool:
+        for _, found in pool.imap_unordered(cycles_of_length, tasks):
+            cycles |= found
+
+    return sorted(cycles, key=lambda c: (len(c), c[0]))
+
+
+def main():
+    a = 5
+    b = 1
+    max_length = 30
+
+    try:
+        cycles = find_cycles(a, b, max_length)
+
+    except KeyboardInterrupt:
+        print("\nInterrupted by user. Exiting cleanly.")
+        sys.exit(0)
+
+    print(f"Cycles of f(x) = {a}*x + {b} with at most {max_length} elements:")
+    with CycleCatalog() as catalog:
+        for cycle in cycles:
+            _, is_new = catalog.add(a, b, cycle)
+            note = " (new)" if is_new else ""
+            print(f"  length {len(cycle)}: {list(cycle)}{note}")
+
+
+if __name__ == "__main__":
+    mp.freeze_support()  # important for Windows
+    main()
@@ -0,0 +1,172 @@
+"""
+Engine for piecewise-linear maps with m residue branches:
+
+    n -> (a_r * n + b_r) / d_r   where r = n mod m
+
+The Collatz map is the case m = 2 with branches (1, 0, 2) and (3, 1, 1).
+A map is compiled once: writing n = m*q + r, each branch becomes
+A[r] * q + B[r] with integer A[r] = a_r * m / d_r and B[r] = (a_r * r + b_r) / d_r,
+so a step is one divmod, one table lookup and one multiply-add, whatever m is.
+"""
+
+import sys
+import multiprocessing as mp
+
+from cycle_catalog import canonical_cycle
+
+
+class PiecewiseMap:
+    """
+    A compiled map. `branches[r]` is (a_r, b_r, d_r) for n = r (mod m).
+
+    Fates of seeds are memoized across calls for every number up to
+    memo_limit in absolute value (None: no limit).
+    """
+
+    def __init__(self, m, branches, memo_limit=1 << 24):
+        if m < 1 or len(branches) != m:
+            raise ValueError(f"Need one branch per residue mod {m}, got {len(branches)}")
+
+        self.m = m
+        self.branches = [tuple(branch) for branch in branches]
+        self.A = []
+        self.B = []
+        for r, (a, b, d) in enumerate(self.branches):
+            if d == 0 or (a * m) % d or (a * r + b) % d:
+                raise ValueError(
+                    f"Branch {r}: ({a}*n + {b})/{d} is not an integer for all n = {r} (mod {m})"
+                )
+            self.A.append(a * m // d)
+            self.B.append((a * r + b) // d)
+
+        self.memo_limit = memo_limit
+        self._fates = {}  # n -> canonical cycle
+
+    @classmethod
+    def from_linear(cls, a, b, **kwargs):
+        """The two-branch map n/2 (n even), a*n + b (n odd)."""
+        return cls(2, [(1, 0, 2), (a, b, 1)], **kwargs)
+
+    def __repr__(self):
+        return f"PiecewiseMap({self.m}, {self.branches})"
+
+    def __getstate__(self):
+        # Workers build their own memo
+        state = self.__dict__.copy()
+        state["_fates"] = {}
+        return state
+
+    def step(self, n):
+        q, r = divmod(n, self.m)
+        return self.A[r] * q + self.B[r]
+
+    def orbit(self, n, max_steps=5000):
+        """
+        Returns (orbit, cycle_start) if n reaches a cycle within max_steps,
+        otherwise None.
+        """
+        m, A, B = self.m, self.A, self.B
+        orbit = []
+        seen = {}
+
+        while n not in seen:
+            if len(orbit) >= max_steps:
+                return None
+            seen[n] = len(orbit)
+            orbit.append(n)
+            q, r = divmod(n, m)
+            n = A[r] * q + B[r]
+
+        return orbit, seen[n]
+
+    def fate(self, n, max_steps=5000):
+        """
+        The canonical cycle n ends in, or None if undecided within max_steps.
+
+        Every number on the way is memoized with the same cycle, so a later
+        orbit stops as soon as it reaches a number whose fate is known.
+        """
+        m, A, B = self.m, self.A, self.B
+        fates = self._fates
+        path = []
+        index = {}
+
+        while n not in fates:
+            if n in index:
+                cycle = canonical_cycle(path[index[n]:])
+                break
+            if len(path) >= max_steps:
+                return None
+            index[n] = len(path)
+            path.append(n)
+            q, r = divmod(n, m)
+            n = A[r] * q + B[r]
+        else:
+            cycle = fates[n]
+
+        limit = self.memo_limit
+        for x in path:
+            if limit is None or -limit <= x <= limit:
+                fates[x] = cycle
+        return cycle
+
+    def fates(self, seeds, max_steps=5000):
+        """Fate of every seed, in order (batch mode, sharing the memo)."""
+        return [self.fate(n, max_steps) for n in seeds]
+
+
+def fate_chunk(args):
+    """Worker function: fates of one chunk of seeds. Returns (start, fates)."""
+    pmap, start, seeds, max_steps = args
+    return start, pmap.fates(seeds, max_steps)
+
+
+def sweep(pmap, seeds, max_steps=5000, processes=None, chunk_size=4096):
+    """
+    Fates of many seeds on a process pool, in order. Seeds are handed out
+    in contiguous chunks so each worker's memo is reused within a chunk.
+    """
+    seeds = list(seeds)
+    tasks = [
+        (pmap, i, seeds[i:i + chunk_size], max_steps)
+        for i in range(0, len(seeds), chunk_size)
+    ]
+
+    fates = [None] * len(seeds)
+    with mp.Pool(processes=processes) as pool:
+        for start, chunk in pool.imap_unordered(fate_chunk, tasks):
+            fates[start:start + len(chunk)] = chunk
+
+    return fates
+
+
+def main():
+    maps = {
+        "3x+1": PiecewiseMap.from_linear(3, 1),
+        "n/3, (4n+2)/3, (4n+1)/3": PiecewiseMap(3, [(1, 0, 3), (4, 2, 3), (4, 1, 3)]),
+        # Collatz's original permutation: 3n/2, (3n+1)/4, (3n-1)/4
+        "Collatz permutation": PiecewiseMap(4, [(3, 0, 2), (3, 1, 4), (3, 0, 2), (3, -1, 4)]),
+    }
+    x_min, x_max = 1, 10000
+    max_steps = 1000
+
+    try:
+        for name, pmap in maps.items():
+            fates = sweep(pmap, range(x_min, x_max + 1), max_steps)
+            counts = {}
+            for cycle in fates:
+                counts[cycle] = counts.get(cycle, 0) + 1
+
+            print(f"{name} {pmap}:")
+            for cycle, count in sorted(counts.items(), key=lambda item: -item[1]):
+                label = "undecided" if cycle is None else f"cycle of length {len(cycle)} from {cycle[0]}"
+                print(f"  {label}: {count} seeds")
+
+    except KeyboardInterrupt:
+        print("\nInterrupted by user. Exiting cleanly.")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    mp.freeze_support()  # important for Windows
+    main()
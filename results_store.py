@@ -0,0 +1,230 @@
+import sqlite3
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    x_min INTEGER NOT NULL,
+    x_max INTEGER NOT NULL,
+    max_steps INTEGER NOT NULL,
+    converging_count INTEGER NOT NULL,
+    cycle_count INTEGER NOT NULL,
+    max_cycle_length INTEGER NOT NULL,
+    PRIMARY KEY (a, b)
+);
+
+CREATE TABLE IF NOT EXISTS cycles (
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    min_element INTEGER NOT NULL,
+    elements TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS seed_ranges (
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    lo INTEGER NOT NULL,
+    hi INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS task_timings (
+    a INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    seeds INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS maps_by_b ON maps (b, a);
+CREATE INDEX IF NOT EXISTS cycles_by_map ON cycles (a, b);
+CREATE INDEX IF NOT EXISTS cycles_by_length ON cycles (length);
+CREATE INDEX IF NOT EXISTS seed_ranges_by_map ON seed_ranges (a, b, kind);
+"""
+
+INT64_MAX = 2**63 - 1
+
+
+def _sql_int(n):
+    """SQLite integers are 64-bit; anything larger is stored as text."""
+    return n if -INT64_MAX <= n <= INT64_MAX else str(n)
+
+
+def seeds_to_intervals(seeds, step=2):
+    """
+    Compress a sorted list of seeds into (lo, hi) intervals of
+    seeds spaced `step` apart. [1, 3, 5, 9, 11] -> [(1, 5), (9, 11)]
+    """
+    intervals = []
+    for n in seeds:
+        if intervals and n == intervals[-1][1] + step:
+            intervals[-1][1] = n
+        else:
+            intervals.append([n, n])
+    return [(lo, hi) for lo, hi in intervals]
+
+
+def intervals_to_seeds(intervals, step=2):
+    seeds = []
+    for lo, hi in intervals:
+        seeds.extend(range(lo, hi + 1, step))
+    return seeds
+
+
+class ResultsStore:
+    """
+    SQLite store for the map enumerator.
+
+    One row per analyzed map (a, b) in `maps`, one row per distinct cycle
+    in `cycles`, and the seeds of each map as compressed intervals in
+    `seed_ranges`. A map row is only written together with its cycles and
+    seed ranges, so a map is either fully stored or not at all.
+    """
+
+    def __init__(self, path="map_results.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # --------------------------------------------------
+    # Writing
+    # --------------------------------------------------
+
+    def record_b(self, b, converging_seeds, cycles, diverging_seeds,
+                 x_min, x_max, max_steps):
+        """Store the results of every a analyzed for this b in one transaction."""
+        self.record_maps(
+            [
+                (a, b, converging_seeds[a], cycles[a], diverging_seeds[a])
+                for a in sorted(converging_seeds)
+            ],
+            x_min, x_max, max_steps,
+        )
+
+    def record_maps(self, results, x_min, x_max, max_steps):
+        """
+        Store a batch of (a, b, converging_seeds, cycles, diverging_seeds)
+        in one transaction.
+        """
+        map_rows = []
+        cycle_rows = []
+        range_rows = []
+
+        for a, b, seeds, map_cycles, diverging in results:
+            map_rows.append((
+                a, b, x_min, x_max, max_steps,
+                len(seeds),
+                len(map_cycles),
+                max((len(cycle) for cycle, _ in map_cycles), default=0),
+            ))
+            for cycle, seed in map_cycles:
+                cycle_rows.append((
+                    a, b, seed, len(cycle), _sql_int(min(cycle)),
+                    ",".join(map(str, cycle)),
+                ))
+            for lo, hi in seeds_to_intervals(seeds):
+                range_rows.append((a, b, "converging", lo, hi))
+            for lo, hi in seeds_to_intervals(diverging):
+                range_rows.append((a, b, "diverging", lo, hi))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO maps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                map_rows,
+            )
+            self.conn.executemany(
+                "DELETE FROM cycles WHERE a = ? AND b = ?",
+                [(row[0], row[1]) for row in map_rows],
+            )
+            self.conn.executemany(
+                "DELETE FROM seed_ranges WHERE a = ? AND b = ?",
+                [(row[0], row[1]) for row in map_rows],
+            )
+            self.conn.executemany(
+                "INSERT INTO cycles VALUES (?, ?, ?, ?, ?, ?)", cycle_rows
+            )
+            self.conn.executemany(
+                "INSERT INTO seed_ranges VALUES (?, ?, ?, ?, ?)", range_rows
+            )
+
+    def record_timings(self, timings):
+        """Store (a, b, seeds, seconds) for each finished task or chunk."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO task_timings VALUES (?, ?, ?, ?)", timings
+            )
+
+    # --------------------------------------------------
+    # Resuming
+    # --------------------------------------------------
+
+    def completed_as(self, b):
+        rows = self.conn.execute("SELECT a FROM maps WHERE b = ?", (b,))
+        return {a for (a,) in rows}
+
+    def resume_b(self, a_values, first_b=1, b_step=2):
+        """First b (from first_b in steps of b_step) missing any of a_values."""
+        a_values = set(a_values)
+        b = first_b
+        while a_values <= self.completed_as(b):
+            b += b_step
+        return b
+
+    # --------------------------------------------------
+    # Queries
+    # --------------------------------------------------
+
+    def seeds(self, a, b, kind):
+        """Seeds of one map with the given kind ("converging" or "diverging")."""
+        rows = self.conn.execute(
+            "SELECT lo, hi FROM seed_ranges WHERE a = ? AND b = ? AND kind = ?"
+            " ORDER BY lo",
+            (a, b, kind),
+        )
+        return intervals_to_seeds(rows.fetchall())
+
+    def converging_seeds(self, a, b):
+        return self.seeds(a, b, "converging")
+
+    def diverging_seeds(self, a, b):
+        return self.seeds(a, b, "diverging")
+
+    def cycles_for(self, a, b):
+        """List of (cycle, seed) for one map, as written by the enumerator."""
+        rows = self.conn.execute(
+            "SELECT elements, seed FROM cycles WHERE a = ? AND b = ?"
+            " ORDER BY rowid",
+            (a, b),
+        )
+        return [
+            (tuple(int(x) for x in elements.split(",")), seed)
+            for elements, seed in rows
+        ]
+
+    def timings(self):
+        return self.conn.execute(
+            "SELECT a, b, seeds, seconds FROM task_timings"
+        ).fetchall()
+
+    def maps_with_cycle_longer_than(self, length):
+        """All (a, b) with at least one cycle of more than `length` elements."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT a, b FROM cycles WHERE length > ? ORDER BY b, a",
+            (length,),
+        )
+        return rows.fetchall()
+
+    def query(self, sql, params=()):
+        """Run an arbitrary read query against the store."""
+        return self.conn.execute(sql, params).fetchall()
@@ -0,0 +1,81 @@
+"""
+Cost-aware longest-processing-time scheduling for map sweeps.
+
+The cost of analyzing one map a*x + b over a set of seeds is predicted
+from the time per seed recorded for the same a in earlier runs (or the
+nearest a that has been timed), falling back to the expected orbit length
+when nothing has been timed yet. Tasks are dispatched longest first, and
+maps predicted to take much longer than the average share of a core are
+split into seed chunks, so all cores stay busy until the end of a sweep.
+"""
+
+from math import ceil
+
+
+class CostModel:
+    """
+    Predicts seconds per task from recorded (a, b, seeds, seconds) timings.
+
+    `prior(a, max_steps)` estimates the steps per seed of a map; it is used,
+    in arbitrary units, until the first task has been timed.
+    """
+
+    def __init__(self, timings=(), prior=None):
+        self.prior = prior or (lambda a, max_steps: max_steps)
+        self.totals = {}  # a -> [seconds, seeds]
+        for a, _, seeds, seconds in timings:
+            self.observe(a, seeds, seconds)
+
+    def observe(self, a, seeds, seconds):
+        total = self.totals.setdefault(a, [0.0, 0])
+        total[0] += seconds
+        total[1] += seeds
+
+    def seconds_per_seed(self, a, max_steps):
+        # Snapshot: the writer thread may be adding timings meanwhile
+        timed = [(x, total) for x, total in list(self.totals.items()) if total[1]]
+        if not timed:
+            # Unit-less, but consistent across a, which is all LPT needs
+            return self.prior(a, max_steps) * 1e-6
+
+        _, (seconds, seeds) = min(timed, key=lambda item: (abs(item[0] - a), item[0]))
+        return seconds / seeds
+
+    def predict(self, a, b, seeds, max_steps):
+        return self.seconds_per_seed(a, max_steps) * seeds
+
+
+def split_seeds(seeds, parts):
+    """Split seeds into `parts` contiguous chunks of nearly equal size."""
+    size, extra = divmod(len(seeds), parts)
+    chunks = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(seeds[start:end])
+        start = end
+    return chunks
+
+
+def plan_b(a_values, b, seeds, max_steps, model, processes, split_factor=4):
+    """
+    LPT plan for one b: a list of (a, seed_chunk, parts), longest first.
+
+    A map whose predicted cost exceeds 1 / (processes * split_factor) of the
+    whole b is split into that many chunks, so no single chunk can hold up
+    the end of the sweep.
+    """
+    costs = {a: model.predict(a, b, len(seeds), max_steps) for a in a_values}
+    total = sum(costs.values())
+    target = total / (processes * split_factor) if total > 0 else 0
+
+    planned = []
+    for a in a_values:
+        parts = 1
+        if target > 0:
+            parts = max(1, min(len(seeds), ceil(costs[a] / target)))
+        for chunk in split_seeds(seeds, parts):
+            planned.append((costs[a] / parts, a, chunk, parts))
+
+    planned.sort(key=lambda task: (-task[0], task[1]))
+    return [(a, chunk, parts) for _, a, chunk, parts in planned]